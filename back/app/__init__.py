@@ -1,18 +1,26 @@
-from datetime import timedelta
+import click
 from flask import Flask
 from flask_cors import CORS
 from flasgger import Swagger
 from app.extensions import db, migrate, jwt
+from app.config import Config
+from app.json_provider import OrjsonProvider
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
+    # jsonify через orjson (app/json_provider.py)
+    app.json = OrjsonProvider(app)
 
-    # Конфигурация
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sportcenter.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SECRET_KEY'] = '12345'
-    app.config['JWT_SECRET_KEY'] = '12345'
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=30)
+    # Конфигурация из переменных окружения (app/config.py)
+    app.config.from_object(Config)
+    # Переопределения (например, отдельная БД для бенчмарков) — до инициализации расширений
+    if config:
+        app.config.update(config)
+
+    # Пул соединений, PRAGMA для SQLite и реплика для чтения (app/database.py)
+    from app.database import engine_options, configure_sqlite, replica_binds
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    app.config.setdefault('SQLALCHEMY_BINDS', replica_binds(app.config.get('DATABASE_REPLICA_URL')))
 
     # Настройки Swagger
     swagger_template = {
@@ -33,6 +41,9 @@ def create_app():
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    # Роль и ее версия в claims токена (app/services/user_cache.py)
+    from app.services.user_cache import add_role_claims
+    jwt.additional_claims_loader(add_role_claims)
     CORS(app) # Разрешаем запросы с фронтенда
     Swagger(app, template=swagger_template)
 
@@ -41,15 +52,52 @@ def create_app():
     from app.routes.sections import sections_bp
     from app.routes.training import training_bp
     from app.routes.ai import ai_bp  # <--- 1. ПРОВЕРЬ ЭТОТ ИМПОРТ
+    from app.routes.diary import diary_bp
 
     # --- РЕГИСТРАЦИЯ ---
     app.register_blueprint(users_bp)
     app.register_blueprint(sections_bp)
     app.register_blueprint(training_bp)  # <--- 2. САМОЕ ВАЖНОЕ: ЭТОЙ СТРОКИ НЕ ХВАТАЕТ!
     app.register_blueprint(ai_bp)
+    app.register_blueprint(diary_bp)
 
     # Создание таблиц
     with app.app_context():
-        db.create_all()
+        configure_sqlite(db.engine, app.config.get('SQLITE_PRAGMAS'))
+        db.create_all(bind_key=None)  # схема только в основной БД, реплика получает ее репликацией
+
+        from app.utils import ensure_columns, ensure_indexes
+        ensure_columns()
+        ensure_indexes()
+
+        # Полнотекстовые индексы заметок (FTS5) и триггеры синхронизации
+        from app.services.note_search import ensure_fts
+        ensure_fts()
+
+        # Кэш отозванных токенов (чтобы не ходить в БД на каждый запрос)
+        from app.services.revocation_cache import revocation_cache
+        revocation_cache.load()
+
+        # Кэш ответов ИИ по промпту
+        from app.services.llm_cache import llm_cache
+        llm_cache.load()
+
+        # Кэш готовых ответов (/sections/, sitemap, robots)
+        from app.services.response_cache import response_cache
+        response_cache.clear()
+
+        # Кэш ролей пользователей (БД могли пересоздать — id уже не те)
+        from app.services.user_cache import user_cache
+        user_cache.clear()
+
+    # --- CLI: flask purge-tokens ---
+    @app.cli.command("purge-tokens")
+    @click.option("--batch-size", default=500, help="Сколько строк удалять за одну транзакцию")
+    def purge_tokens(batch_size):
+        """Удалить истекшие записи из token_blocklist"""
+        from app.services.token_cleanup import purge_expired_tokens
+        stats = purge_expired_tokens(batch_size)
+        click.echo(f"token_blocklist: {stats['rows_before']} -> {stats['rows_after']} "
+                   f"(удалено {stats['deleted']})")
 
     return app
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""
+Конфигурация из переменных окружения (docker-compose.yml / .env).
+Значения по умолчанию — для локального запуска без Docker.
+"""
+import os
+from datetime import timedelta
+
+
+def _database_url(value):
+    # Heroku/Render и старые примеры пишут postgres:// — SQLAlchemy 2 понимает только postgresql://
+    if value and value.startswith("postgres://"):
+        return "postgresql://" + value[len("postgres://"):]
+    return value
+
+
+class Config:
+    SECRET_KEY = os.environ.get("SECRET_KEY", "12345")
+    JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "12345")
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=30)
+
+    # Основная БД (запись) и необязательная реплика только для чтения.
+    # Относительный путь SQLite — от папки instance/ приложения
+    SQLALCHEMY_DATABASE_URI = _database_url(os.environ.get("DATABASE_URL", "sqlite:///sportcenter.db"))
+    DATABASE_REPLICA_URL = _database_url(os.environ.get("DATABASE_REPLICA_URL"))
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Фоновая чистка token_blocklist внутри процесса (секунды, 0 — выключена).
+    # Под gunicorn каждый воркер запустил бы свой таймер, поэтому в Docker-образе она
+    # выключена, а чистку делает отдельный сервис token-purge (flask purge-tokens)
+    TOKEN_PURGE_INTERVAL = int(os.environ.get("TOKEN_PURGE_INTERVAL", 3600))
+
+    WEATHER_API_KEY = os.environ.get("WEATHER_API_KEY", "d2ba7fa31d914df5412cc57dd71323c3")
+
+    # MinIO: внутренний адрес (из Docker-сети) и публичный — для подписанных ссылок в браузер
+    MINIO_ENDPOINT = os.environ.get("MINIO_ENDPOINT", "http://minio:9000")
+    MINIO_PUBLIC_ENDPOINT = os.environ.get("MINIO_PUBLIC_ENDPOINT", "http://localhost:9000")
+    MINIO_ACCESS_KEY = os.environ.get("MINIO_ACCESS_KEY", "minioadmin")
+    MINIO_SECRET_KEY = os.environ.get("MINIO_SECRET_KEY", "minioadmin")
+    MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "sportcenter-bucket")
@@ -0,0 +1,122 @@
+"""
+Настройки движка БД: PRAGMA для SQLite, пул соединений на воркер (SQLite / PostgreSQL)
+и маршрутизация чтения на реплику.
+
+Под gunicorn каждый воркер — отдельный процесс со своим пулом, а запись в SQLite
+всегда одна на файл. В режиме WAL читатели не ждут писателя, а писатели ждут друг
+друга до busy_timeout, вместо мгновенного "database is locked".
+"""
+import os
+from functools import wraps
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event
+from sqlalchemy.engine import make_url
+
+# Применяются на каждое новое соединение (journal_mode=WAL сохраняется в файле БД)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",       # в WAL безопасно: теряется максимум последняя транзакция при сбое ОС
+    "busy_timeout": 5000,          # мс ожидания блокировки записи
+    "cache_size": -20000,          # ~20 МБ кэша страниц на соединение (отрицательное — в КиБ)
+    "mmap_size": 128 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+# Фоновые потоки, которым тоже нужны соединения: советы ИИ (2), превью (2),
+# очередь удаления из S3 и чистка токенов
+BACKGROUND_THREADS = 6
+
+
+def is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+REPLICA_BIND = "replica"
+
+
+def _pool_size():
+    threads = int(os.environ.get("WEB_THREADS", 4))
+    return int(os.environ.get("DB_POOL_SIZE", threads + BACKGROUND_THREADS))
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS для воркера: пул = потоки воркера + фоновые потоки"""
+    if make_url(uri).get_backend_name() == "postgresql":
+        return {
+            "pool_size": _pool_size(),
+            "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+            "pool_timeout": 10,
+            "pool_pre_ping": True,   # соединение, закрытое сервером/pgbouncer, заменится до запроса
+            "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        }
+    if not is_sqlite_file(uri):
+        return {}
+    pool_size = _pool_size()
+    return {
+        "pool_size": pool_size,
+        "max_overflow": 0,       # больше соединений запись в SQLite не ускорит
+        "pool_timeout": 10,
+        "connect_args": {
+            # busy handler драйвера (в секундах) — то же ожидание, что busy_timeout
+            "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000,
+            "check_same_thread": False,
+        },
+    }
+
+
+def configure_sqlite(engine, pragmas=None):
+    """Вешает установку PRAGMA на подключение к SQLite (для других СУБД ничего не делает)"""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    # Соединения, открытые до подписки, пересоздаем
+    engine.dispose()
+
+
+def replica_binds(replica_url):
+    """SQLALCHEMY_BINDS с репликой (или пустой словарь, если реплики нет)"""
+    if not replica_url:
+        return {}
+    return {REPLICA_BIND: {"url": replica_url, **engine_options(replica_url)}}
+
+
+class RoutingSession(Session):
+    """
+    SELECT внутри эндпоинтов с @read_replica идут на реплику (если она настроена),
+    все остальное — на основную БД. Запись, flush и запросы с блокировкой — всегда на основную.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and has_app_context() and g.get("use_replica") and not self._flushing
+                and isinstance(clause, Select) and clause._for_update_arg is None):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(fn):
+    """
+    Эндпоинт только читает — его запросы можно отдать реплике.
+    Реплика может отставать на доли секунды: не для ответов сразу после записи.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            g.use_replica = False
+    return wrapper
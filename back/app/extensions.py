@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
+from app.database import RoutingSession
 
-db = SQLAlchemy()
+# Сессия сама выбирает основную БД или реплику (app/database.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""
+JSON для ответов API через orjson (подключается в create_app: app.json = OrjsonProvider(app)).
+
+orjson сам кодирует datetime/date в ISO 8601 (как to_dict()), поэтому списки можно
+отдавать строками запроса (Row._asdict()) без isoformat() на каждую строку.
+Ответ собирается сразу в bytes, без промежуточной str.
+"""
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+# sort_keys как у стандартного провайдера Flask: одинаковые данные — одинаковые байты (ETag)
+_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+
+class OrjsonProvider(DefaultJSONProvider):
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = _OPTIONS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype
+        )
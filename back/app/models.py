@@ -16,6 +16,9 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(20), default='user', nullable=False)
+    # Растет при каждой смене роли и попадает в токен (claim "rv"). Права всегда берутся из
+    # user_cache/БД, а не из токена; токен с более новой версией лишь заставляет воркер перечитать роль
+    role_version = db.Column(db.Integer, default=0, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     sections = db.relationship('Section', secondary=user_sections, back_populates='users')
@@ -54,6 +57,12 @@ class Section(db.Model):
 
 class Training(db.Model):
     __tablename__ = 'training'
+    # Индексы под выборки /training/: фильтр по user_id (+ section_id) и сортировки
+    __table_args__ = (
+        db.Index('ix_training_user_date', 'user_id', 'date'),
+        db.Index('ix_training_user_section_date', 'user_id', 'section_id', 'date'),
+        db.Index('ix_training_user_intensity', 'user_id', 'intensity'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     section_id = db.Column(db.Integer, db.ForeignKey('section.id'), nullable=False)
@@ -81,14 +90,55 @@ class Training(db.Model):
             "file_key": self.file_key
         }
 
+class TrainingDailyRollup(db.Model):
+    """Готовые суммы по тренировкам за день (пользователь + секция) для /training/stats"""
+    __tablename__ = 'training_daily_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', 'section_id', name='uq_rollup_user_day_section'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    section_id = db.Column(db.Integer, db.ForeignKey('section.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    sessions = db.Column(db.Integer, default=0, nullable=False)
+    total_duration = db.Column(db.Integer, default=0, nullable=False)
+    intensity_sum = db.Column(db.Integer, default=0, nullable=False)
+    total_load = db.Column(db.Integer, default=0, nullable=False)  # сумма duration * intensity
+
+class TrainingLoadState(db.Model):
+    """Состояние нагрузки атлета: EWMA острой (7 дн.) и хронической (28 дн.) нагрузки на день ref_day"""
+    __tablename__ = 'training_load_state'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    ref_day = db.Column(db.Date, nullable=False)
+    acute = db.Column(db.Float, default=0.0, nullable=False)
+    chronic = db.Column(db.Float, default=0.0, nullable=False)
+    first_day = db.Column(db.Date, nullable=True)         # с какого дня есть история (для ACWR нужно >= 28 дн.)
+    last_training_at = db.Column(db.DateTime, nullable=True)
+    last_intensity = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class DiaryEntry(db.Model):
     __tablename__ = 'diary_entry'
+    # Выборка за период и синхронизация «что изменилось с прошлого раза»
+    __table_args__ = (
+        db.Index('ix_diary_user_date', 'user_id', 'date'),
+        db.Index('ix_diary_user_updated', 'user_id', 'updated_at'),
+        db.Index('uq_diary_user_client', 'user_id', 'client_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     section = db.Column(db.String(120))  
     date = db.Column(db.Date, nullable=False)
     note = db.Column(db.String(1000))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Офлайн-синхронизация: id записи на устройстве, время правки на устройстве,
+    # время последней записи на сервере и «надгробие» вместо физического удаления
+    client_id = db.Column(db.String(64), nullable=True)
+    client_updated_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    deleted = db.Column(db.Boolean, default=False)
+
     user = db.relationship('User', back_populates='diary_entries')
 
     def to_dict(self):
@@ -98,7 +148,11 @@ class DiaryEntry(db.Model):
             "section": self.section,
             "date": self.date.isoformat(),
             "note": self.note,
-            "created_at": self.created_at.isoformat()
+            "created_at": self.created_at.isoformat(),
+            "client_id": self.client_id,
+            "client_updated_at": self.client_updated_at.isoformat() if self.client_updated_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "deleted": bool(self.deleted)
         }
 
 class DailyAdvice(db.Model):
@@ -122,11 +176,41 @@ class DailyAdvice(db.Model):
 
 class TokenBlocklist(db.Model):
     __tablename__ = 'token_blocklist'
+    # Составной индекс ровно под проверку filter_by(jti=..., revoked=True)
+    __table_args__ = (
+        db.Index('ix_token_blocklist_jti_revoked', 'jti', 'revoked'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    jti = db.Column(db.String(36), nullable=False, index=True) 
+    jti = db.Column(db.String(36), nullable=False) 
     token_type = db.Column(db.String(10), nullable=False)      
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     revoked = db.Column(db.Boolean, default=False)             
-    expires = db.Column(db.DateTime, nullable=False)           
+    expires = db.Column(db.DateTime, nullable=False, index=True)
+    # Индекс — под догрузку новых отзывов в revocation_cache.sync
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    user = db.relationship('User', back_populates='tokens')
+
+class S3DeletionOutbox(db.Model):
+    """Очередь файлов на удаление из S3 (пишется в одной транзакции с удалением тренировки)"""
+    __tablename__ = 's3_deletion_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    file_key = db.Column(db.String(255), nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class LLMResponse(db.Model):
+    """Варианты ответа ИИ на одинаковый промпт (ключ — sha256 промпта и параметров модели)"""
+    __tablename__ = 'llm_response_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    prompt_hash = db.Column(db.String(64), nullable=False, index=True)
+    message = db.Column(db.String(500), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user = db.relationship('User', back_populates='tokens')
\ No newline at end of file
+
+class CacheVersion(db.Model):
+    """Версия кэшируемого ответа (например, списка секций): растет при каждом изменении данных"""
+    __tablename__ = 'cache_version'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
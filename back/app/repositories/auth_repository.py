@@ -1,5 +1,6 @@
-from app.models import User, TokenBlocklist
+from app.models import User
 from app.extensions import db
+from app.services.revocation_cache import revocation_cache
 
 class AuthRepository:
     def get_user_by_username(self, username):
@@ -10,5 +11,4 @@ class AuthRepository:
         db.session.commit()
 
     def is_token_revoked(self, jti):
-        token = TokenBlocklist.query.filter_by(jti=jti, revoked=True).first()
-        return token is not None
\ No newline at end of file
+        return revocation_cache.is_revoked(jti)
\ No newline at end of file
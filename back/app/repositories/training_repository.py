@@ -1,5 +1,48 @@
+import base64
+import json
+from datetime import datetime
 from app.models import Training
-from sqlalchemy import or_
+from app.services import note_search
+from sqlalchemy import or_, tuple_
+
+# Ключи keyset-пагинации для каждой сортировки: (колонка, направление)
+KEYSET_SORTS = {
+    'date_desc': (Training.date, 'desc'),
+    'date_asc': (Training.date, 'asc'),
+    'intensity_desc': (Training.intensity, 'desc'),
+}
+MAX_CURSOR_PAGE = 100  # строк на страницу ленты
+
+
+def encode_cursor(sort, value, row_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (sort, value, id) или бросает ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort, value, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Неверный cursor")
+    # Курсор приходит от клиента: типы проверяем, иначе TypeError ниже дает 500
+    if not isinstance(sort, str) or sort not in KEYSET_SORTS or not _is_int(row_id):
+        raise ValueError("Неверный cursor")
+    if KEYSET_SORTS[sort][0] is Training.date:
+        if not isinstance(value, str):
+            raise ValueError("Неверный cursor")
+        value = datetime.fromisoformat(value)
+    elif value is not None and not _is_int(value):  # intensity может быть NULL
+        raise ValueError("Неверный cursor")
+    return sort, value, row_id
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
 
 class TrainingRepository:
     def get_filtered(self, user_id, args):
@@ -7,26 +50,61 @@ class TrainingRepository:
 
         # 1. Поиск (Пункт 2.2)
         search = args.get('search')
-        if search:
-            query = query.filter(Training.note.ilike(f"%{search}%"))
+        sort = args.get('sort', 'date_desc')
+        query = note_search.apply_search(query, Training, search, user_id, rank=(sort == 'relevance'))
 
         # 2. Фильтрация (Пункт 2.1)
         section_id = args.get('section_id')
         if section_id:
             query = query.filter(Training.section_id == section_id)
-            
+
         min_intensity = args.get('min_intensity')
         if min_intensity:
             query = query.filter(Training.intensity >= int(min_intensity))
 
         # 3. Сортировка (Пункт 2.3)
-        sort = args.get('sort', 'date_desc')
-        if sort == 'date_asc': query = query.order_by(Training.date.asc())
+        if sort == 'relevance' and search: pass  # уже по bm25
+        elif sort == 'date_asc': query = query.order_by(Training.date.asc())
         elif sort == 'intensity_desc': query = query.order_by(Training.intensity.desc())
         else: query = query.order_by(Training.date.desc())
 
         # 4. Пагинация (Пункт 2.3)
-        page = int(args.get('page', 1))
         per_page = int(args.get('per_page', 5))
-        
-        return query.paginate(page=page, per_page=per_page, error_out=False)
\ No newline at end of file
+        if 'cursor' in args:
+            return self.get_page_by_cursor(query, sort, args.get('cursor'), per_page)
+
+        page = int(args.get('page', 1))
+        return query.paginate(page=page, per_page=per_page, error_out=False)
+
+    def get_page_by_cursor(self, query, sort, cursor, per_page):
+        """
+        Keyset-пагинация: WHERE (ключ, id) < (значение из курсора) вместо OFFSET.
+        Страница стоит одинаково на любой глубине, COUNT(*) не выполняется.
+        Возвращает (items, next_cursor).
+        """
+        if sort not in KEYSET_SORTS:
+            sort = 'date_desc'
+        column, direction = KEYSET_SORTS[sort]
+        # 0 ломает next_cursor (пустая страница), отрицательный LIMIT в SQLite — «без лимита»
+        per_page = max(1, min(per_page, MAX_CURSOR_PAGE))
+
+        if cursor:
+            cursor_sort, value, row_id = decode_cursor(cursor)
+            if cursor_sort != sort:
+                raise ValueError("cursor выдан для другой сортировки")
+            key = tuple_(column, Training.id)
+            query = query.filter(key < (value, row_id) if direction == 'desc' else key > (value, row_id))
+
+        if direction == 'desc':
+            query = query.order_by(None).order_by(column.desc(), Training.id.desc())
+        else:
+            query = query.order_by(None).order_by(column.asc(), Training.id.asc())
+
+        # Берем на одну строку больше, чтобы понять, есть ли следующая страница
+        rows = query.limit(per_page + 1).all()
+        items = rows[:per_page]
+        next_cursor = None
+        if len(rows) > per_page:
+            last = items[-1]
+            next_cursor = encode_cursor(sort, getattr(last, column.key), last.id)
+        return items, next_cursor
@@ -1,71 +1,64 @@
 import json
-import requests
-from flask import Blueprint, jsonify, request
+from contextlib import closing
+import click
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_cors import cross_origin
 from app.extensions import db
 from app.models import Training, DailyAdvice
-from datetime import date, datetime
+from app.services import training_load
+from app.services.advice_service import (
+    advice_queue, generate_message, save_advice, stream_message, build_prompt, SCENARIOS,
+    ollama_breaker, FALLBACK_MESSAGE
+)
+from datetime import date, datetime, timedelta
 
 ai_bp = Blueprint('ai', __name__, url_prefix='/ai')
 
-def generate_decision_and_prompt(history):
-    if not history:
+def generate_decision_and_prompt(state, as_json=True):
+    """state — строка TrainingLoadState (training_load.get_state), None — тренировок еще нет"""
+    if state is None:
         # Для новичка отдаем готовые данные, не тревожим ИИ зря
         return None, None
     
-    last_training = history[0]
-    days_since = (date.today() - last_training.date.date()).days
-    last_int = last_training.intensity
+    load = training_load.snapshot(state)
+    days_since = load["days_since"]
+    last_int = load["last_intensity"]
+    acwr = load["acwr"]  # None, пока истории меньше 28 дней
     
     # --- 1. ЖЕЛЕЗНАЯ ЛОГИКА PYTHON (Она не ошибается) ---
+    # (те же правила векторно применяет пакетный движок app/services/batch_advice.py)
     
-    # Сценарий А: Перетренированность (Тяжело + Недавно)
-    if last_int >= 8 and days_since <= 1:
-        target_status = "rest"
+    # Сценарий А: Перетренированность (Тяжело + Недавно, или острая нагрузка резко выше привычной)
+    if (last_int >= 8 and days_since <= 1) or (acwr is not None and acwr > training_load.ACWR_DANGER):
+        scenario = "overload"
         target_intensity = 2
-        ai_instruction = "Атлет переутомлен (нагрузка была предельной). Твоя задача: КАТЕГОРИЧЕСКИ ЗАПРЕТИТЬ тяжелые нагрузки. Посоветуй полный отдых или прогулку."
     
-    # Сценарий Б: Халява (Легко + Недавно)
-    elif last_int <= 4 and days_since <= 2:
-        target_status = "progress"
+    # Сценарий Б: Халява (Легко + Недавно), если общая нагрузка не на пределе
+    elif last_int <= 4 and days_since <= 2 and not (acwr is not None and acwr > training_load.ACWR_CAUTION):
+        scenario = "too_easy"
         target_intensity = 9
-        ai_instruction = "Атлет расслабился (прошлая тренировка была слишком легкой). Твоя задача: ДАТЬ ВОЛШЕБНЫЙ ПИНОК. Требуй выложиться на 100%."
     
     # Сценарий В: Долгий перерыв (> 4 дней)
     elif days_since > 4:
-        target_status = "recovery"
+        scenario = "long_break"
         target_intensity = 5
-        ai_instruction = "Атлет давно не занимался. Нельзя резко начинать. Посоветуй втягивающую тренировку, чтобы не получить травму."
         
     # Сценарий Г: Нормальный режим
     else:
-        target_status = "progress"
-        # Небольшая прогрессия
-        target_intensity = min(last_int + 1, 9) 
-        ai_instruction = "Атлет в хорошем ритме. Похвали и предложи немного усложнить задачу."
+        scenario = "normal"
+        # Небольшая прогрессия (в зоне «осторожно» — держим текущий уровень)
+        if acwr is not None and acwr > training_load.ACWR_CAUTION:
+            target_intensity = min(last_int, 9)
+        else:
+            target_intensity = min(last_int + 1, 9)
 
     # --- 2. ФОРМИРУЕМ ПРОМПТ ТОЛЬКО ДЛЯ ТЕКСТА ---
     # Мы уже всё решили за ИИ, ему нужно только написать красивый текст.
-    
-    prompt_text = f"""
-    Ты спортивный тренер.
-    
-    СИТУАЦИЯ:
-    Последняя тренировка была {days_since} дн. назад с нагрузкой {last_int}/10.
-    
-    ТВОЯ ЗАДАЧА:
-    {ai_instruction}
-    
-    СФОРМИРУЙ ОТВЕТ В JSON:
-    {{
-        "message": "Твой совет на русском языке (дерзкий или заботливый, в зависимости от задачи, макс 20 слов)"
-    }}
-    (Поля status и suggested_intensity я заполню сам, от тебя нужен только message).
-    """
+    prompt_text = build_prompt(days_since, last_int, scenario, as_json)
     
     # Возвращаем и промпт, и уже рассчитанные цифры
-    return prompt_text, {"status": target_status, "intensity": target_intensity}
+    return prompt_text, {"status": SCENARIOS[scenario]["status"], "intensity": target_intensity}
 
 @ai_bp.route('/recommend', methods=['GET', 'OPTIONS'])
 @cross_origin()
@@ -87,13 +80,11 @@ def recommend_load():
             "from_cache": True
         })
 
-    # 2. ПОЛУЧЕНИЕ ИСТОРИИ
-    history = Training.query.filter_by(user_id=user_id)\
-                            .order_by(Training.date.desc())\
-                            .limit(5).all()
+    # 2. СОСТОЯНИЕ НАГРУЗКИ (одна строка по первичному ключу, без истории тренировок)
+    state = training_load.get_state(user_id)
 
     # 3. ГЕНЕРАЦИЯ РЕШЕНИЯ (PYTHON)
-    prompt, decision = generate_decision_and_prompt(history)
+    prompt, decision = generate_decision_and_prompt(state)
     
     # Если новичок
     if prompt is None:
@@ -103,50 +94,128 @@ def recommend_load():
             "suggested_intensity": 3
         })
 
-
-    # 4. ГЕНЕРАЦИЯ ТЕКСТА (OLLAMA)
-    try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "qwen2.5:3b",
-                "prompt": prompt,
-                "stream": False,
-                "format": "json",
-                "options": {"temperature": 0.4}
-            },
-            timeout=10
-        )
-        
-        ai_response = response.json()
-        raw_text = ai_response.get("response", "{}")
-        ai_data = json.loads(raw_text)
-        
-        # БЕРЕМ СООБЩЕНИЕ ОТ ИИ, А ЦИФРЫ — ОТ PYTHON
-        final_message = ai_data.get("message", "Следуйте плану.")
-        
-        # Сохранение
-        new_advice = DailyAdvice(
-            user_id=user_id,
-            date=today,
-            status=decision['status'],         # <--- Берем из Python
-            message=final_message,             # <--- Берем от ИИ
-            suggested_intensity=decision['intensity'] # <--- Берем из Python
-        )
-        db.session.add(new_advice)
-        db.session.commit()
-        
-        return jsonify({
-            "status": new_advice.status,
-            "message": new_advice.message,
-            "suggested_intensity": new_advice.suggested_intensity
-        })
-
-    except Exception as e:
-        print(f"❌ AI Error: {e}")
-        # Если ИИ упал, у нас все равно есть рассчитанные цифры!
+    # Ollama недоступна (цепь разомкнута или генерация только что упала) — «Тренер
+    # формулирует совет...» так и не сменится, поэтому сразу отдаем цифры с запасным текстом.
+    # В DailyAdvice не пишем: когда Ollama поднимется, совет сгенерируется
+    if ollama_breaker.is_open() or advice_queue.failed_recently(user_id, today):
         return jsonify({
             "status": decision['status'],
-            "message": "ИИ молчит, но математика советует вот это.",
+            "message": FALLBACK_MESSAGE,
             "suggested_intensity": decision['intensity']
-        })
\ No newline at end of file
+        })
+
+    # 4. ГЕНЕРАЦИЯ ТЕКСТА (OLLAMA) — в фоне, запрос ее не ждет.
+    # Цифры уже посчитаны Python, текст появится в DailyAdvice через несколько секунд
+    advice_queue.submit(current_app._get_current_object(), user_id, today, prompt, decision)
+    return jsonify({
+        "status": decision['status'],
+        "message": "Тренер формулирует совет...",
+        "suggested_intensity": decision['intensity'],
+        "message_pending": True
+    })
+
+
+# --- Острая/хроническая нагрузка и ACWR ---
+@ai_bp.route('/load', methods=['GET'])
+@cross_origin()
+@jwt_required()
+def get_training_load():
+    state = training_load.get_state(int(get_jwt_identity()))
+    if state is None:
+        return jsonify({"acute_load": 0, "chronic_load": 0, "acwr": None, "zone": "unknown",
+                        "days_since": None, "last_intensity": None})
+    return jsonify(training_load.snapshot(state))
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# --- SSE: цифры сразу, текст ИИ — по мере генерации ---
+@ai_bp.route('/recommend/stream', methods=['GET'])
+@cross_origin()
+@jwt_required()
+def recommend_stream():
+    user_id = int(get_jwt_identity())
+    today = date.today()
+
+    # Все, что нужно из БД, читаем до начала потока
+    existing_advice = DailyAdvice.query.filter_by(user_id=user_id, date=today).first()
+    cached = existing_advice.to_dict() if existing_advice else None
+    prompt, decision = (None, None) if cached else generate_decision_and_prompt(training_load.get_state(user_id), as_json=False)
+
+    def events():
+        if cached:
+            yield _sse("decision", {"status": cached["status"],
+                                    "suggested_intensity": cached["suggested_intensity"],
+                                    "from_cache": True})
+            yield _sse("done", {"message": cached["message"]})
+            return
+
+        if prompt is None:
+            yield _sse("decision", {"status": "beginner", "suggested_intensity": 3})
+            yield _sse("done", {"message": "Добро пожаловать в мир спорта! Начнем плавно."})
+            return
+
+        yield _sse("decision", {"status": decision["status"], "suggested_intensity": decision["intensity"]})
+
+        parts = []
+        try:
+            # closing: при отключении клиента поток Ollama закрывается сразу, а не сборщиком мусора
+            with closing(stream_message(prompt)) as tokens:
+                for token in tokens:
+                    parts.append(token)
+                    yield _sse("token", {"text": token})
+        except Exception as e:
+            print(f"❌ AI Error: {e}")
+            yield _sse("done", {"message": FALLBACK_MESSAGE})
+            return
+
+        message = "".join(parts).strip() or "Следуйте плану."
+        save_advice(user_id, today, decision, message[:500])
+        yield _sse("done", {"message": message})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # nginx не должен копить поток в буфере
+    })
+
+
+# --- CLI: flask ai precompute (запускать ночью по cron) ---
+@ai_bp.cli.command("precompute")
+@click.option("--days", default=30, help="Активные = тренировались за последние N дней")
+@click.option("--batch", is_flag=True, help="Векторный расчет для всех пользователей (NumPy), текст только из кэша ИИ")
+def precompute_advice(days, batch):
+    """Заранее сгенерировать совет дня для всех активных пользователей"""
+    today = date.today()
+    if batch:
+        from app.services.batch_advice import run_batch
+        created, skipped = run_batch(today)
+        click.echo(f"Советы на {today}: создано {created} (пакетный режим), "
+                   f"без текста в кэше ИИ {skipped} — их посчитает обычный режим")
+        return
+
+    training_load.build_missing()
+    since = datetime.combine(today - timedelta(days=days), datetime.min.time())
+    user_ids = [row[0] for row in db.session.query(Training.user_id)
+                .filter(Training.date >= since).distinct()]
+    done_ids = {row[0] for row in db.session.query(DailyAdvice.user_id)
+                .filter(DailyAdvice.date == today)}
+
+    created, failed = 0, 0
+    for user_id in user_ids:
+        if user_id in done_ids:
+            continue
+        prompt, decision = generate_decision_and_prompt(training_load.get_state(user_id))
+        if prompt is None:
+            continue
+        try:
+            save_advice(user_id, today, decision, generate_message(prompt))
+            created += 1
+        except Exception as e:
+            db.session.rollback()
+            failed += 1
+            print(f"❌ AI Error (user {user_id}): {e}")
+
+    click.echo(f"Советы на {today}: создано {created}, ошибок {failed}, "
+               f"уже были {len(done_ids)}")
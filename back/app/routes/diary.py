@@ -0,0 +1,224 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import insert, update, tuple_
+from sqlalchemy.orm import joinedload, raiseload
+from app.extensions import db
+from app.database import read_replica
+from app.models import DiaryEntry
+from app.services import note_search
+from datetime import datetime, date, timedelta
+
+diary_bp = Blueprint('diary', __name__, url_prefix='/diary')
+
+MAX_BATCH = 500           # записей в одном POST / sync
+MAX_PULL = 1000           # изменений сервера в одном ответе sync
+# updated_at ставится до commit: запись параллельного запроса может стать видна позже,
+# чем вышел server_time с большим значением. Поэтому since отматывается на это окно назад,
+# а повторно пришедшие записи клиент просто применяет заново (ключ — client_id)
+SYNC_OVERLAP = timedelta(minutes=1)
+DEFAULT_RANGE_DAYS = 30
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _parse_entry(item):
+    """Запись из JSON -> dict для insert; бросает ValueError с понятным текстом"""
+    if not isinstance(item, dict):
+        raise ValueError("запись должна быть объектом")
+    if not item.get("date"):
+        raise ValueError("не указана дата")
+    try:
+        entry_date = _parse_date(item["date"])
+    except (TypeError, ValueError):
+        raise ValueError("неверный формат даты (нужен ГГГГ-ММ-ДД)")
+    note = item.get("note") or ""
+    section = item.get("section") or None
+    if not isinstance(note, str):
+        raise ValueError("заметка должна быть строкой")
+    if section is not None and not isinstance(section, str):
+        raise ValueError("секция должна быть строкой")
+    if len(note) > 1000:
+        raise ValueError("заметка длиннее 1000 символов")
+    if section is not None and len(section) > 120:
+        raise ValueError("название секции длиннее 120 символов")
+    return {"date": entry_date, "note": note, "section": section}
+
+
+def _parse_batch(key, allow_empty=False):
+    """
+    Список записей из тела запроса ({key: [...]} или просто [...]) либо (None, ответ с ошибкой).
+    allow_empty — пустой или отсутствующий список допустим (sync без локальных правок)
+    """
+    data = request.get_json(silent=True)
+    items = data.get(key) if isinstance(data, dict) else data
+    if allow_empty and items is None:
+        items = []
+    if not isinstance(items, list) or not (items or allow_empty):
+        return None, (jsonify({"error": f"Нужен непустой список {key}"}), 400)
+    if len(items) > MAX_BATCH:
+        return None, (jsonify({"error": f"Не больше {MAX_BATCH} записей за раз"}), 400)
+    return items, None
+
+
+def build_diary_query(user_id, date_from, date_to, search=None):
+    """Записи за период [date_from, date_to] (отдельно, чтобы тесты проверяли план запроса)"""
+    query = DiaryEntry.query.filter(
+        DiaryEntry.user_id == user_id,
+        DiaryEntry.date >= date_from,
+        DiaryEntry.date <= date_to,
+        DiaryEntry.deleted.isnot(True)
+    ).options(joinedload(DiaryEntry.user), raiseload('*'))
+    query = note_search.apply_search(query, DiaryEntry, search, user_id)
+    return query.order_by(DiaryEntry.date.desc(), DiaryEntry.id.desc())
+
+
+# ==========================================================
+# GET: Записи за период (?from=&to=, по умолчанию последние 30 дней; ?search=)
+# ==========================================================
+@diary_bp.route('/', methods=['GET'])
+@read_replica
+@jwt_required()
+def get_entries():
+    user_id = int(get_jwt_identity())
+    search = request.args.get('search', '', type=str)
+    try:
+        date_to = _parse_date(request.args['to']) if 'to' in request.args else date.today()
+        date_from = _parse_date(request.args['from']) if 'from' in request.args \
+            else date_to - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    except ValueError:
+        return jsonify({"error": "Неверный формат даты (нужен ГГГГ-ММ-ДД)"}), 400
+
+    items = build_diary_query(user_id, date_from, date_to, search).all()
+    found = note_search.snippets(DiaryEntry, [e.id for e in items], search, user_id)
+    entries = []
+    for entry in items:
+        d = entry.to_dict()
+        if entry.id in found:
+            d['snippet'] = found[entry.id]
+        entries.append(d)
+
+    return jsonify({"from": date_from.isoformat(), "to": date_to.isoformat(), "entries": entries})
+
+
+# ==========================================================
+# POST: Пакетное добавление — все записи одним INSERT (executemany) в одной транзакции
+# ==========================================================
+@diary_bp.route('/', methods=['POST'])
+@jwt_required()
+def add_entries():
+    user_id = int(get_jwt_identity())
+    items, error = _parse_batch("entries")
+    if error:
+        return error
+
+    now = datetime.utcnow()
+    rows = []
+    for i, item in enumerate(items):
+        try:
+            row = _parse_entry(item)
+        except ValueError as e:
+            # Ничего не пишем, если хоть одна запись битая
+            return jsonify({"error": f"Запись {i}: {e}"}), 400
+        rows.append({**row, "user_id": user_id, "created_at": now, "updated_at": now, "deleted": False})
+
+    db.session.execute(insert(DiaryEntry), rows)
+    db.session.commit()
+    return jsonify({"message": "Записи добавлены", "created": len(rows)}), 201
+
+
+# ==========================================================
+# POST: Офлайн-синхронизация
+# Клиент присылает свои изменения (client_id + client_updated_at, deleted — удаление;
+# список может быть пустым — тогда это только загрузка) и since — server_time из прошлого ответа. Конфликты решаются по времени правки на
+# устройстве (побеждает более поздняя). В ответ — все, что изменилось на сервере с since
+# (без since — весь дневник; с запасом SYNC_OVERLAP, так что часть записей может прийти
+# повторно), не больше MAX_PULL записей за раз: при has_more клиент повторяет запрос
+# с since и since_id из ответа, пока has_more не станет false.
+# ==========================================================
+@diary_bp.route('/sync', methods=['POST'])
+@jwt_required()
+def sync_entries():
+    user_id = int(get_jwt_identity())
+    items, error = _parse_batch("changes", allow_empty=True)
+    if error:
+        return error
+
+    since, since_id = None, None
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and data.get("since"):
+        try:
+            since = datetime.fromisoformat(data["since"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "Неверный since"}), 400
+        since_id = data.get("since_id")
+        if since_id is not None and (not isinstance(since_id, int) or isinstance(since_id, bool)):
+            return jsonify({"error": "Неверный since_id"}), 400
+
+    changes = {}
+    for i, item in enumerate(items):
+        try:
+            client_id = str(item.get("client_id") or "") if isinstance(item, dict) else ""
+            if not client_id or len(client_id) > 64:
+                raise ValueError("нужен client_id (до 64 символов)")
+            client_updated_at = datetime.fromisoformat(item.get("client_updated_at") or "")
+            if client_updated_at.tzinfo:
+                client_updated_at = client_updated_at.replace(tzinfo=None) - client_updated_at.utcoffset()
+            row = {"deleted": True} if item.get("deleted") else _parse_entry(item)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Изменение {i}: {e}"}), 400
+        # Одна запись несколько раз в пакете — берем последнюю правку
+        if client_id not in changes or changes[client_id]["client_updated_at"] <= client_updated_at:
+            changes[client_id] = {**row, "client_id": client_id, "client_updated_at": client_updated_at}
+
+    # Уже известные серверу записи — одним запросом
+    existing = {
+        e.client_id: e for e in DiaryEntry.query.options(raiseload('*')).filter(
+            DiaryEntry.user_id == user_id, DiaryEntry.client_id.in_(list(changes)))
+    }
+
+    now = datetime.utcnow()
+    inserts, updates, conflicts = [], [], []
+    for client_id, change in changes.items():
+        entry = existing.get(client_id)
+        if entry is None:
+            if change.get("deleted"):
+                # Удаление записи, которой сервер не видел: сохраняем «надгробие» для других устройств
+                change = {**change, "date": date.today(), "note": "", "section": None}
+            inserts.append({"deleted": False, **change, "user_id": user_id, "created_at": now, "updated_at": now})
+        elif entry.client_updated_at and entry.client_updated_at > change["client_updated_at"]:
+            conflicts.append(client_id)  # на сервере более свежая правка — клиент получит ее ниже
+        else:
+            updates.append({"deleted": False, **change, "id": entry.id, "updated_at": now})
+
+    if inserts:
+        db.session.execute(insert(DiaryEntry), inserts)
+    if updates:
+        db.session.execute(update(DiaryEntry), updates)  # bulk UPDATE по первичному ключу
+    db.session.commit()
+
+    # Что изменилось на сервере с прошлой синхронизации (кроме только что принятого от клиента)
+    applied = {row["client_id"] for row in inserts + updates}
+    pull = DiaryEntry.query.options(joinedload(DiaryEntry.user), raiseload('*')).filter(DiaryEntry.user_id == user_id)
+    if since_id is not None:
+        # Продолжение усеченного ответа: у записей одного пакета updated_at совпадает, поэтому ключ — (updated_at, id)
+        pull = pull.filter(tuple_(DiaryEntry.updated_at, DiaryEntry.id) > (since, since_id))
+    elif since:
+        pull = pull.filter(DiaryEntry.updated_at > since - SYNC_OVERLAP)
+    rows = pull.order_by(DiaryEntry.updated_at, DiaryEntry.id).limit(MAX_PULL + 1).all()
+    has_more = len(rows) > MAX_PULL
+    rows = rows[:MAX_PULL]
+    server_changes = [e.to_dict() for e in rows if e.client_id not in applied]
+
+    result = {
+        "applied": len(applied),
+        "conflicts": conflicts,
+        "changes": server_changes,
+        "server_time": now.isoformat(),
+        "has_more": has_more
+    }
+    if has_more:
+        result["server_time"] = rows[-1].updated_at.isoformat()
+        result["since_id"] = rows[-1].id
+    return jsonify(result)
@@ -1,14 +1,22 @@
-from flask import Blueprint, jsonify, Response
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
 from app.services.weather_service import WeatherService
+from app.services.circuit_breaker import breakers
+from app.services.llm_cache import llm_cache
+from app.services.response_cache import response_cache, cached_response
+from app.utils import admin_required
 
 external_bp = Blueprint('external', __name__)
 weather_service = WeatherService()
 
+# Статичные SEO-файлы: браузеры и nginx могут держать их сутки
+SEO_MAX_AGE = 24 * 3600
+
 # --- SEO: robots.txt (Пункт 3.2) ---
 @external_bp.route('/robots.txt')
 def robots():
     content = "User-agent: *\nDisallow: /diary\nDisallow: /users\nSitemap: http://localhost:5173/sitemap.xml"
-    return Response(content, mimetype="text/plain")
+    return cached_response("robots", lambda: content, mimetype="text/plain", max_age=SEO_MAX_AGE)
 
 # --- SEO: sitemap.xml (Пункт 3.1) ---
 @external_bp.route('/sitemap.xml')
@@ -18,7 +26,7 @@ def sitemap():
         <url><loc>http://localhost:5173/</loc><priority>1.0</priority></url>
         <url><loc>http://localhost:5173/about</loc><priority>0.8</priority></url>
     </urlset>"""
-    return Response(xml, mimetype="application/xml")
+    return cached_response("sitemap", lambda: xml, mimetype="application/xml", max_age=SEO_MAX_AGE)
 
 # --- API Погоды (Пункт 5.2) ---
 @external_bp.route('/weather')
@@ -26,4 +34,16 @@ def get_weather():
     data = weather_service.get_weather()
     if not data:
         return jsonify({"error": "Weather unavailable"}), 503
-    return jsonify(data)
\ No newline at end of file
+    return jsonify(data)
+
+# --- Состояние внешних зависимостей (предохранители Ollama / OpenWeather / MinIO) ---
+# Внутренности кэшей и предохранителей — только админу
+@external_bp.route('/status')
+@jwt_required()
+@admin_required()
+def dependencies_status():
+    return jsonify({
+        "breakers": {name: breaker.status() for name, breaker in breakers.items()},
+        "llm_cache": llm_cache.status(),
+        "response_cache": response_cache.status()
+    })
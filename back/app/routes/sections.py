@@ -3,11 +3,17 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
 from app.models import Section, User, Training
 from app.utils import admin_required 
+from app.database import read_replica
+from app.services.response_cache import response_cache, cached_response
 
 sections_bp = Blueprint('sections', __name__, url_prefix='/sections')
 
+# Имя в response_cache: версия растет при добавлении / изменении / удалении секции
+SECTIONS_CACHE = "sections"
+
 
 @sections_bp.route('/', methods=['GET'])
+@read_replica
 def get_sections():
     """
     Получить список всех доступных секций
@@ -31,10 +37,15 @@ def get_sections():
                   description:
                     type: string
     """
-    sections = Section.query.all()
+    return cached_response(SECTIONS_CACHE, _sections_body, max_age=10, stale_while_revalidate=60)
+
+
+def _sections_body():
+    # Только колонки из Section.to_dict(), без ORM-объектов
+    rows = db.session.query(Section.id, Section.name, Section.description).order_by(Section.id)
     return jsonify({
-        "sections": [s.to_dict() for s in sections]
-    })
+        "sections": [row._asdict() for row in rows]
+    }).get_data()
 
 
 @sections_bp.route('/', methods=['POST'])
@@ -84,6 +95,7 @@ def add_section():
     )
     
     db.session.add(new_section)
+    response_cache.bump(SECTIONS_CACHE)
     db.session.commit()
     
     return jsonify(new_section.to_dict()), 201
@@ -133,6 +145,7 @@ def update_section(section_id):
     if "description" in data:
         section.description = data["description"]
         
+    response_cache.bump(SECTIONS_CACHE)
     db.session.commit()
     
     return jsonify(section.to_dict())
@@ -177,6 +190,7 @@ def delete_section(section_id):
 
     section_name = section.name
     db.session.delete(section)
+    response_cache.bump(SECTIONS_CACHE)
     db.session.commit()
     
     return jsonify({"message": f"Секция '{section_name}' удалена"})
@@ -2,18 +2,101 @@ import uuid
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
-from app.models import Training, Section, DailyAdvice
-from app.services.s3_service import S3Service 
-from datetime import datetime, date
-from sqlalchemy import func # Импортируем func для работы с датами в SQL
+from app.database import read_replica
+from app.models import Training, Section, User, DailyAdvice
+from app.services.s3_service import S3Service, UploadTooLarge
+from app.repositories.training_repository import TrainingRepository
+from app.services.deletion_queue import S3DeletionQueue
+from app.services.thumbnail_service import ThumbnailService, thumb_key
+from app.services import note_search, training_load, training_stats
+import click
+from datetime import datetime, date, timedelta
 
 training_bp = Blueprint('training', __name__, url_prefix='/training')
 s3_service = S3Service()
+training_repo = TrainingRepository()
+deletion_queue = S3DeletionQueue(s3_service)
+thumbnails = ThumbnailService(s3_service)
+
+MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+
+# Поля Training.to_dict() колонками: строки (Row) вместо ORM-объектов —
+# без identity map и to_dict() на каждую тренировку; datetime кодирует orjson
+TRAINING_LIST_COLUMNS = (
+    Training.id,
+    User.username.label("user"),
+    Section.name.label("section"),
+    Training.section_id,
+    Training.duration,
+    Training.intensity,
+    Training.date,
+    Training.note,
+    Training.file_key,
+)
+
+
+def build_trainings_query(user_id, search=None, section_id=None, filter_date_str=None, sort='date_desc'):
+    """Запрос списка тренировок (вынесен отдельно, чтобы тесты проверяли план запроса)"""
+    # Автор и секция — JOIN'ом в том же запросе
+    query = db.session.query(*TRAINING_LIST_COLUMNS).select_from(Training) \
+        .outerjoin(User, User.id == Training.user_id) \
+        .outerjoin(Section, Section.id == Training.section_id) \
+        .filter(Training.user_id == user_id)
+
+    # Фильтр по тексту (поиск в заметках через FTS5; sort=relevance — по bm25)
+    query = note_search.apply_search(query, Training, search, user_id, rank=(sort == 'relevance'))
+    
+    # Фильтр по секции
+    if section_id:
+        query = query.filter(Training.section_id == section_id)
+
+    # НОВОЕ: Фильтрация по конкретной дате (Пункт 3.1 лабораторной)
+    # Полуоткрытый диапазон [день, следующий день) вместо func.date(),
+    # иначе индекс (user_id, date) не используется
+    if filter_date_str:
+        try:
+            day_start = datetime.strptime(filter_date_str, "%Y-%m-%d")
+            query = query.filter(Training.date >= day_start,
+                                 Training.date < day_start + timedelta(days=1))
+        except ValueError:
+            pass # Если формат даты неверный, игнорируем фильтр
+
+    # Сортировка
+    if sort == 'relevance' and search:
+        pass  # уже отсортировано по релевантности
+    elif sort == 'date_asc':
+        query = query.order_by(Training.date.asc())
+    elif sort == 'intensity_desc':
+        query = query.order_by(Training.intensity.desc())
+    else:
+        query = query.order_by(Training.date.desc())
+
+    return query
+
+
+def _serialize_trainings(items, search=None, user_id=None):
+    # Все ссылки на файлы страницы (оригиналы + превью) подписываются одним вызовом (с кэшем)
+    keys = [t.file_key for t in items if t.file_key]
+    urls = s3_service.get_urls(keys + [thumb_key(k) for k in keys])
+    # Фрагменты с подсветкой — одним запросом на страницу
+    found = note_search.snippets(Training, [t.id for t in items], search, user_id)
+    trainings_list = []
+    for t in items:
+        d = t._asdict()
+        if t.id in found:
+            d['snippet'] = found[t.id]
+        if t.file_key:
+            d['file_url'] = urls[t.file_key]
+            d['thumb_url'] = urls[thumb_key(t.file_key)]
+        trainings_list.append(d)
+    return trainings_list
+
 
 # ==========================================================
 # GET: Список с фильтрацией по ДАТЕ, поиском и пагинацией
 # ==========================================================
 @training_bp.route('/', methods=['GET'])
+@read_replica
 @jwt_required()
 def get_trainings():
     user_id = get_jwt_identity()
@@ -28,43 +111,28 @@ def get_trainings():
     # НОВОЕ: Получаем дату фильтрации (например "2026-03-26")
     filter_date_str = request.args.get('date', None, type=str) 
 
-    # 2. Построение базового запроса
-    query = Training.query.filter_by(user_id=user_id)
-
-    # Фильтр по тексту (поиск в заметках)
-    if search:
-        query = query.filter(Training.note.ilike(f"%{search}%"))
-    
-    # Фильтр по секции
-    if section_id:
-        query = query.filter(Training.section_id == section_id)
+    query = build_trainings_query(user_id, search, section_id, filter_date_str, sort)
 
-    # НОВОЕ: Фильтрация по конкретной дате (Пункт 3.1 лабораторной)
-    # Сравниваем только дату в БД (без учета часов/минут) с присланной датой
-    if filter_date_str:
+    # 3а. Keyset-пагинация (?cursor=, для бесконечной ленты): без OFFSET и COUNT(*)
+    if 'cursor' in request.args:
         try:
-            target_date = datetime.strptime(filter_date_str, "%Y-%m-%d").date()
-            query = query.filter(func.date(Training.date) == target_date)
-        except ValueError:
-            pass # Если формат даты неверный, игнорируем фильтр
+            items, next_cursor = training_repo.get_page_by_cursor(
+                query, sort, request.args.get('cursor'), per_page)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-    # Сортировка
-    if sort == 'date_asc':
-        query = query.order_by(Training.date.asc())
-    elif sort == 'intensity_desc':
-        query = query.order_by(Training.intensity.desc())
-    else:
-        query = query.order_by(Training.date.desc())
+        result = {
+            "trainings": _serialize_trainings(items, search, user_id),
+            "next_cursor": next_cursor
+        }
+        if request.args.get('include_total') == '1':
+            result["total"] = query.order_by(None).count()
+        return jsonify(result)
 
     # 3. Выполнение серверной пагинации
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
-    trainings_list = []
-    for t in pagination.items:
-        d = t.to_dict()
-        if t.file_key:
-            d['file_url'] = s3_service.get_url(t.file_key)
-        trainings_list.append(d)
+    trainings_list = _serialize_trainings(pagination.items, search, user_id)
 
     return jsonify({
         "trainings": trainings_list,
@@ -74,6 +142,85 @@ def get_trainings():
     })
 
 
+# ==========================================================
+# GET: Статистика по дням/неделям (из готовой сводки training_daily_rollup)
+# ==========================================================
+@training_bp.route('/stats', methods=['GET'])
+@read_replica
+@jwt_required()
+def get_training_stats():
+    user_id = int(get_jwt_identity())
+    section_id = request.args.get('section_id', None, type=int)
+
+    try:
+        date_to = datetime.strptime(request.args['to'], "%Y-%m-%d").date() if 'to' in request.args else date.today()
+        date_from = datetime.strptime(request.args['from'], "%Y-%m-%d").date() if 'from' in request.args \
+            else date_to - timedelta(days=27)
+    except ValueError:
+        return jsonify({"error": "Неверный формат даты (нужен ГГГГ-ММ-ДД)"}), 400
+
+    return jsonify(training_stats.get_stats(user_id, date_from, date_to, section_id))
+
+
+# --- CLI: flask training rebuild-stats (заполнить сводку по уже существующим тренировкам) ---
+@training_bp.cli.command("rebuild-stats")
+def rebuild_stats():
+    """Пересчитать training_daily_rollup по всем тренировкам"""
+    click.echo(f"Строк в сводке: {training_stats.rebuild()}")
+
+
+# ==========================================================
+# POST: Потоковая загрузка фото (тело запроса = сам файл)
+# Возвращает file_key, который затем передается в POST /training/
+# ==========================================================
+@training_bp.route('/upload', methods=['POST'])
+@jwt_required()
+def upload_attachment():
+    user_id = get_jwt_identity()
+
+    # Если клиент честно прислал Content-Length — отказываем, не читая тело
+    if request.content_length and request.content_length > MAX_UPLOAD_SIZE:
+        return jsonify({"error": "Файл слишком большой (макс 5МБ)"}), 413
+
+    ext = request.mimetype.rsplit('/', 1)[-1] if '/' in request.mimetype else 'jpg'
+    filename = f"user_{user_id}/{uuid.uuid4()}.{ext}"
+
+    try:
+        file_key = s3_service.upload_stream(request.stream, filename, request.mimetype, MAX_UPLOAD_SIZE)
+    except UploadTooLarge:
+        return jsonify({"error": "Файл слишком большой (макс 5МБ)"}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Ошибка S3: {str(e)}"}), 500
+
+    return jsonify({"file_key": file_key}), 201
+
+
+# ==========================================================
+# POST: Ссылка для прямой загрузки фото в бакет (presigned POST)
+# Клиент отправляет форму прямо в MinIO, затем передает file_key в POST /training/
+# ==========================================================
+@training_bp.route('/upload-url', methods=['POST'])
+@jwt_required()
+def get_upload_url():
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    content_type = data.get("content_type", "image/jpeg") if isinstance(data, dict) else None
+    if not isinstance(content_type, str):
+        return jsonify({"error": "content_type должен быть строкой"}), 400
+
+    ext = content_type.rsplit('/', 1)[-1] if '/' in content_type else 'jpg'
+    file_key = f"user_{user_id}/{uuid.uuid4()}.{ext}"
+
+    try:
+        post = s3_service.get_upload_post(file_key, content_type, MAX_UPLOAD_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"file_key": file_key, "url": post["url"], "fields": post["fields"]})
+
+
 # ==========================================================
 # POST: Добавить тренировку (Исправлен парсинг даты)
 # ==========================================================
@@ -93,7 +240,7 @@ def add_training():
         file.seek(0, 2)
         size = file.tell()
         file.seek(0)
-        if size > 5 * 1024 * 1024:
+        if size > MAX_UPLOAD_SIZE:
             return jsonify({"error": "Файл слишком большой (макс 5МБ)"}), 400
 
         ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'jpg'
@@ -103,6 +250,17 @@ def add_training():
             file_key = s3_service.upload_file(file, filename, file.content_type)
         except Exception as e:
             return jsonify({"error": f"Ошибка S3: {str(e)}"}), 500
+    elif data.get("file_key"):
+        # Файл уже загружен (POST /training/upload или напрямую по upload-url):
+        # проверяем только, что объект есть в бакете
+        file_key = data.get("file_key")
+        if not file_key.startswith(f"user_{user_id}/"):
+            return jsonify({"error": "Неверный file_key"}), 400
+        try:
+            if not s3_service.file_exists(file_key):
+                return jsonify({"error": "Файл не найден в хранилище"}), 400
+        except Exception as e:
+            return jsonify({"error": f"Ошибка S3: {str(e)}"}), 500
 
     # Чтение даты из запроса (поддержка формата YYYY-MM-DD)
     training_date = datetime.utcnow()
@@ -129,6 +287,8 @@ def add_training():
     )
 
     db.session.add(new_training)
+    training_stats.record(new_training)
+    training_load.record(new_training)
     
     # Сброс кэша ИИ
     today_advice = DailyAdvice.query.filter_by(user_id=user_id, date=date.today()).first()
@@ -136,11 +296,14 @@ def add_training():
         db.session.delete(today_advice)
 
     db.session.commit()
+
+    # Превью для списка генерируется в фоне
+    thumbnails.submit(file_key)
     return jsonify({"message": "Создано", "training": new_training.to_dict()}), 201
 
 
 # ==========================================================
-# DELETE: Остается без изменений
+# DELETE: Удаление тренировки (файл — через очередь)
 # ==========================================================
 @training_bp.route('/<int:training_id>', methods=['DELETE'])
 @jwt_required()
@@ -151,12 +314,11 @@ def delete_training(training_id):
     if not training or str(training.user_id) != str(user_id):
         return jsonify({"error": "Не найдено"}), 404
 
-    if training.file_key:
-        try:
-            s3_service.delete_file(training.file_key)
-        except:
-            pass
-
+    # Файл удалится фоновой очередью (в той же транзакции, что и сама запись)
+    deletion_queue.enqueue(training.file_key)
+    deletion_queue.enqueue(thumb_key(training.file_key))
+    training_stats.record(training, sign=-1)
+    training_load.record(training, sign=-1)
     db.session.delete(training)
     
     today_advice = DailyAdvice.query.filter_by(user_id=user_id, date=date.today()).first()
@@ -164,4 +326,5 @@ def delete_training(training_id):
         db.session.delete(today_advice)
 
     db.session.commit()
+    deletion_queue.wake()
     return jsonify({"message": "Удалено успешно"})
\ No newline at end of file
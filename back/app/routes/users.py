@@ -3,10 +3,14 @@ from flask_jwt_extended import (
     jwt_required, get_jwt_identity, get_jwt,
     create_access_token, create_refresh_token
 )
+from collections import defaultdict
 from datetime import timedelta, datetime
 from app.extensions import db
-from app.models import User, TokenBlocklist
+from app.database import read_replica
+from app.models import User, Section, TokenBlocklist, user_sections
 from app.utils import admin_required
+from app.services.revocation_cache import revocation_cache
+from app.services.user_cache import user_cache
 
 # ==========================================================
 # СЛОИ АРХИТЕКТУРЫ (Repository & Service)
@@ -20,7 +24,17 @@ class UserRepository:
         return User.query.filter_by(username=username).first()
 
     def get_all(self):
-        return User.query.all()
+        """
+        Поля User.to_dict() колонками (Row), без ORM-объектов: пользователи одним
+        запросом, секции всех пользователей — вторым, без запроса на каждого
+        """
+        sections = defaultdict(list)
+        links = db.session.query(user_sections.c.user_id, Section.id, Section.name, Section.description) \
+            .join(Section, Section.id == user_sections.c.section_id)
+        for user_id, section_id, name, description in links:
+            sections[user_id].append({"id": section_id, "name": name, "description": description})
+        rows = db.session.query(User.id, User.username, User.role, User.created_at).order_by(User.id)
+        return [{**row._asdict(), "sections": sections[row.id]} for row in rows]
 
     def save(self, obj):
         db.session.add(obj)
@@ -43,6 +57,9 @@ class AuthService:
         if not user or not user.check_password(password):
             return None
         
+        # Роль для claims токена берется из кэша — пользователь уже загружен
+        user_cache.put(user)
+
         # Генерация пары токенов (Access и Refresh)
         access = create_access_token(identity=str(user.id), expires_delta=timedelta(minutes=15))
         refresh = create_refresh_token(identity=str(user.id), expires_delta=timedelta(days=30))
@@ -59,6 +76,7 @@ class AuthService:
         blocked = TokenBlocklist(jti=jti, token_type=token_type, user_id=int(user_id), expires=expires, revoked=True)
         db.session.add(blocked)
         db.session.commit()
+        revocation_cache.add(jti, expires)
 
 # Инициализация
 user_repo = UserRepository()
@@ -158,6 +176,7 @@ def user_profile():
     return jsonify(user.to_dict(include_email=True))
 
 @users_bp.route('/', methods=['GET'])
+@read_replica
 @jwt_required()
 @admin_required()
 def get_all_users():
@@ -167,8 +186,7 @@ def get_all_users():
     tags: [Users]
     security: [{Bearer: []}]
     """
-    users = user_repo.get_all()
-    return jsonify({"users": [u.to_dict() for u in users]})
+    return jsonify({"users": user_repo.get_all()})
 
 @users_bp.route('/<int:user_id>/role', methods=['PUT'])
 @jwt_required()
@@ -185,6 +203,12 @@ def change_user_role(user_id):
     user = user_repo.get_by_id(user_id)
     if not user:
         return jsonify({"error": "Пользователь не найден"}), 404
-    user.role = new_role
+    if user.role != new_role:
+        user.role = new_role
+        # Права берутся не из токена, а из user_cache (ниже сбрасываем запись этого воркера,
+        # остальные перечитают роль через ttl или раньше — по токену с новой версией).
+        # Claim "role" в старых токенах остается прежним до их обновления — он только для фронтенда.
+        user.role_version = (user.role_version or 0) + 1
     db.session.commit()
+    user_cache.invalidate(user_id)
     return jsonify({"message": "Роль изменена", "user": user.to_dict()})
\ No newline at end of file
@@ -0,0 +1,237 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from app.extensions import db
+from app.models import DailyAdvice
+from app.services.circuit_breaker import get_breaker, CircuitOpenError
+from app.services.llm_cache import llm_cache
+
+OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_MODEL = "qwen2.5:3b"
+OLLAMA_OPTIONS = {"temperature": 0.4}
+# Длина колонок message в llm_response_cache и daily_advice (String(500))
+MAX_MESSAGE_LENGTH = 500
+# Текст вместо совета ИИ, когда Ollama недоступна: цифры все равно посчитаны Python
+FALLBACK_MESSAGE = "ИИ молчит, но математика советует вот это."
+RETRY_AFTER = 60  # секунд: после ошибки генерации совет пользователя не перезапрашиваем
+
+# Сценарии решения: статус для фронта и задача для ИИ
+SCENARIOS = {
+    "overload": {
+        "status": "rest",
+        "instruction": "Атлет переутомлен (нагрузка была предельной). Твоя задача: КАТЕГОРИЧЕСКИ ЗАПРЕТИТЬ тяжелые нагрузки. Посоветуй полный отдых или прогулку."
+    },
+    "too_easy": {
+        "status": "progress",
+        "instruction": "Атлет расслабился (прошлая тренировка была слишком легкой). Твоя задача: ДАТЬ ВОЛШЕБНЫЙ ПИНОК. Требуй выложиться на 100%."
+    },
+    "long_break": {
+        "status": "recovery",
+        "instruction": "Атлет давно не занимался. Нельзя резко начинать. Посоветуй втягивающую тренировку, чтобы не получить травму."
+    },
+    "normal": {
+        "status": "progress",
+        "instruction": "Атлет в хорошем ритме. Похвали и предложи немного усложнить задачу."
+    },
+}
+
+
+def build_prompt(days_since, last_int, scenario, as_json=True):
+    ai_instruction = SCENARIOS[scenario]["instruction"]
+    if as_json:
+        answer_format = """СФОРМИРУЙ ОТВЕТ В JSON:
+    {
+        "message": "Твой совет на русском языке (дерзкий или заботливый, в зависимости от задачи, макс 20 слов)"
+    }
+    (Поля status и suggested_intensity я заполню сам, от тебя нужен только message)."""
+    else:
+        # Для потоковой выдачи (SSE) нужен чистый текст, без JSON-обертки
+        answer_format = """ОТВЕТЬ ОДНИМ-ДВУМЯ ПРЕДЛОЖЕНИЯМИ на русском языке (дерзко или заботливо,
+    в зависимости от задачи, макс 20 слов). Без JSON, кавычек и пояснений."""
+
+    return f"""
+    Ты спортивный тренер.
+    
+    СИТУАЦИЯ:
+    Последняя тренировка была {days_since} дн. назад с нагрузкой {last_int}/10.
+    
+    ТВОЯ ЗАДАЧА:
+    {ai_instruction}
+    
+    {answer_format}
+    """
+
+
+class OllamaClientError(Exception):
+    """4xx от Ollama (нет модели, неверный запрос): сервис жив, это не повод размыкать цепь"""
+
+
+# Если Ollama лежит, не ждем 10с таймаута на каждом запросе — сразу отдаем ответ Python
+ollama_breaker = get_breaker("ollama", ignored_exceptions=(OllamaClientError,))
+
+
+def _raise_for_status(response):
+    """5xx от Ollama — отказ для предохранителя, 4xx — OllamaClientError"""
+    try:
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code < 500:
+            raise OllamaClientError(str(e)) from e
+        raise
+
+
+def _ollama_generate(payload, timeout=10):
+    response = requests.post(OLLAMA_URL, json=payload, timeout=timeout)
+    _raise_for_status(response)
+    return response
+
+
+def generate_message(prompt):
+    """Текст совета от ИИ. Цифры (status/intensity) ИИ не доверяем — их считает Python"""
+    # Такой же промпт уже был — берем один из сохраненных вариантов
+    cache_key = llm_cache.make_key(prompt, OLLAMA_MODEL, OLLAMA_OPTIONS)
+    cached = llm_cache.get(cache_key)
+    if cached:
+        return cached
+
+    response = ollama_breaker.call(_ollama_generate, {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": False,
+        "format": "json",
+        "options": OLLAMA_OPTIONS
+    })
+
+    ai_response = response.json()
+    raw_text = ai_response.get("response", "{}")
+    ai_data = json.loads(raw_text)
+    message = ai_data.get("message")
+    if not message:
+        return "Следуйте плану."
+    # Модель не всегда слушается «макс 20 слов»: обрезаем под колонку, иначе PostgreSQL откажет в INSERT
+    message = str(message)[:MAX_MESSAGE_LENGTH]
+    llm_cache.put(cache_key, message)
+    return message
+
+
+def stream_message(prompt, timeout=10):
+    """
+    Потоковая генерация: Ollama отдает NDJSON по мере генерации,
+    отдаем куски текста сразу, не дожидаясь конца ответа.
+    """
+    if not ollama_breaker.allow():
+        raise CircuitOpenError("ollama: сервис временно недоступен")
+
+    # Итог вызова для предохранителя фиксируется при ЛЮБОМ выходе: в том числе при
+    # GeneratorExit (клиент SSE отключился) и SystemExit — иначе пробный слот
+    # полуоткрытой цепи остается занятым навсегда
+    outcome = None
+    received = False
+    try:
+        response = requests.post(OLLAMA_URL, json={
+            "model": OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": True,
+            "options": OLLAMA_OPTIONS
+        }, stream=True, timeout=timeout)
+        _raise_for_status(response)
+
+        with response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                received = True
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+        outcome = True
+    except OllamaClientError:
+        outcome = True  # Ollama ответила, ошибка в запросе
+        raise
+    except Exception:
+        outcome = False
+        raise
+    finally:
+        if outcome is False:
+            ollama_breaker.record_failure()
+        elif outcome or received:
+            # Клиент ушел посреди ответа — Ollama при этом отвечала исправно
+            ollama_breaker.record_success()
+        else:
+            ollama_breaker.release()
+
+
+def save_advice(user_id, day, decision, message):
+    """Сохраняет совет дня (если его еще нет — например, записал параллельный запрос)"""
+    advice = DailyAdvice.query.filter_by(user_id=user_id, date=day).first()
+    if advice:
+        return advice
+    advice = DailyAdvice(
+        user_id=user_id,
+        date=day,
+        status=decision['status'],                # <--- Берем из Python
+        message=message,                          # <--- Берем от ИИ
+        suggested_intensity=decision['intensity'] # <--- Берем из Python
+    )
+    db.session.add(advice)
+    db.session.commit()
+    return advice
+
+
+class AdviceQueue:
+    """Генерация текста совета в фоне: HTTP-запрос не ждет Ollama"""
+
+    def __init__(self, workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="advice")
+        self._pending = set()
+        self._failed = {}  # (user_id, day) -> время ошибки
+        self._lock = threading.Lock()
+
+    def submit(self, app, user_id, day, prompt, decision):
+        key = (user_id, day)
+        with self._lock:
+            # Пользователь обновил страницу, пока совет готовится — второй раз не ставим
+            if key in self._pending:
+                return None
+            self._pending.add(key)
+        return self._pool.submit(self._run, app, user_id, day, prompt, decision)
+
+    def is_pending(self, user_id, day):
+        with self._lock:
+            return (user_id, day) in self._pending
+
+    def failed_recently(self, user_id, day):
+        """Генерация для пользователя недавно упала — ждать текста бессмысленно, отдаем FALLBACK_MESSAGE"""
+        with self._lock:
+            failed_at = self._failed.get((user_id, day))
+            if failed_at is None:
+                return False
+            if time.monotonic() - failed_at < RETRY_AFTER:
+                return True
+            del self._failed[(user_id, day)]
+            return False
+
+    def _run(self, app, user_id, day, prompt, decision):
+        try:
+            with app.app_context():
+                try:
+                    message = generate_message(prompt)
+                    save_advice(user_id, day, decision, message)
+                    return message
+                except Exception as e:
+                    db.session.rollback()
+                    with self._lock:
+                        self._failed[(user_id, day)] = time.monotonic()
+                    print(f"❌ AI Error: {e}")
+                finally:
+                    db.session.remove()
+        finally:
+            with self._lock:
+                self._pending.discard((user_id, day))
+
+
+advice_queue = AdviceQueue()
@@ -0,0 +1,95 @@
+from datetime import date
+import numpy as np
+from sqlalchemy import insert
+from app.extensions import db
+from app.models import DailyAdvice, TrainingLoadState
+from app.services import training_load
+from app.services.advice_service import SCENARIOS, OLLAMA_MODEL, OLLAMA_OPTIONS, build_prompt
+from app.services.llm_cache import llm_cache
+
+# Порядок важен: как в цепочке if/elif
+SCENARIO_ORDER = ["overload", "too_easy", "long_break", "normal"]
+
+
+def load_states(today=None):
+    """Массивы NumPy из training_load_state: user_id, дней с последней тренировки, ее интенсивность, ACWR"""
+    today = today or date.today()
+    training_load.build_missing()  # у кого состояния еще нет (старые данные) — собираем один раз
+    rows = db.session.query(
+        TrainingLoadState.user_id, TrainingLoadState.last_training_at, TrainingLoadState.last_intensity,
+        TrainingLoadState.ref_day, TrainingLoadState.first_day, TrainingLoadState.acute, TrainingLoadState.chronic
+    ).filter(TrainingLoadState.last_training_at.isnot(None)).all()
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty, np.array([], dtype=np.float64)
+
+    user_ids, last_at, last_int, ref_day, first_day, acute, chronic = zip(*rows)
+    today64 = np.datetime64(today, 'D')
+    days_since = (today64 - np.array([d.date() for d in last_at], dtype='datetime64[D]')).astype(np.int64)
+    last_int = np.array([training_load.DEFAULT_INTENSITY if i is None else i for i in last_int], dtype=np.int64)
+
+    # Затухание от ref_day до сегодня, как в training_load.snapshot
+    gap = np.maximum((today64 - np.array(ref_day, dtype='datetime64[D]')).astype(np.int64), 0)
+    acute = np.array(acute) * (1 - training_load.ACUTE_LAMBDA) ** gap
+    chronic = np.array(chronic) * (1 - training_load.CHRONIC_LAMBDA) ** gap
+    history = (today64 - np.array(first_day, dtype='datetime64[D]')).astype(np.int64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acwr = np.where((history >= training_load.CHRONIC_DAYS) & (chronic > 0),
+                        np.round(acute / chronic, 2), np.nan)  # NaN — ACWR еще не считаем
+    return np.array(user_ids, dtype=np.int64), days_since, last_int, acwr
+
+
+def decide(days_since, last_int, acwr):
+    """Векторная версия правил generate_decision_and_prompt. Возвращает (индекс сценария, интенсивность)"""
+    # Сравнения с NaN дают False — как проверка acwr is not None
+    high = acwr > training_load.ACWR_CAUTION
+    overload = ((last_int >= 8) & (days_since <= 1)) | (acwr > training_load.ACWR_DANGER)
+    too_easy = (last_int <= 4) & (days_since <= 2) & ~high
+    long_break = days_since > 4
+
+    conditions = [overload, too_easy, long_break]
+    scenario = np.select(conditions, [0, 1, 2], default=3)
+    progress = np.where(high, np.minimum(last_int, 9), np.minimum(last_int + 1, 9))
+    intensity = np.select(conditions, [2, 9, 5], default=progress)
+    return scenario, intensity
+
+
+def _message_for(scenario_idx, days_since, last_int):
+    # Текст берем из кэша ответов ИИ (у одинаковых входов одинаковый промпт); None — в кэше нет
+    prompt = build_prompt(int(days_since), int(last_int), SCENARIO_ORDER[scenario_idx])
+    return llm_cache.get(llm_cache.make_key(prompt, OLLAMA_MODEL, OLLAMA_OPTIONS))
+
+
+def run_batch(today=None):
+    """
+    Советы дня для всех пользователей с тренировками; возвращает (создано, пропущено).
+    Пропускаются те, для кого текста ИИ нет в кэше: заглушку в daily_advice не пишем,
+    иначе /ai/recommend весь день отдавал бы ее как готовый совет. Им совет сгенерирует
+    обычный режим (flask ai precompute) или очередь при первом /ai/recommend.
+    """
+    today = today or date.today()
+    user_ids, days_since, last_int, acwr = load_states(today)
+
+    # У кого совет на сегодня уже есть — не трогаем
+    done = np.array([row[0] for row in db.session.query(DailyAdvice.user_id)
+                     .filter(DailyAdvice.date == today)], dtype=np.int64)
+    todo = ~np.isin(user_ids, done)
+    user_ids, days_since, last_int, acwr = user_ids[todo], days_since[todo], last_int[todo], acwr[todo]
+    if not len(user_ids):
+        return 0, 0
+
+    scenario, intensity = decide(days_since, last_int, acwr)
+
+    # Уникальных комбинаций входов мало — промпт/текст считаем по разу на комбинацию
+    combos, inverse = np.unique(np.stack([scenario, days_since, last_int], axis=1), axis=0, return_inverse=True)
+    messages = np.array([_message_for(*combo) for combo in combos], dtype=object)[inverse.ravel()]
+    statuses = np.array([SCENARIOS[name]["status"] for name in SCENARIO_ORDER], dtype=object)[scenario]
+
+    rows = [
+        {"user_id": int(u), "date": today, "status": st, "message": msg, "suggested_intensity": int(i)}
+        for u, st, msg, i in zip(user_ids, statuses, messages, intensity) if msg is not None
+    ]
+    if rows:
+        db.session.execute(insert(DailyAdvice), rows)
+        db.session.commit()
+    return len(rows), len(user_ids) - len(rows)
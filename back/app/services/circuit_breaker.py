@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для внешней зависимости (Ollama, OpenWeather, MinIO).
+    Считает долю ошибок по последним `window` вызовам; если она выше порога —
+    цепь размыкается, и вызывающий код сразу уходит в свой запасной вариант,
+    не дожидаясь таймаута. Через reset_timeout пропускается пробный вызов.
+    """
+
+    def __init__(self, name, window=20, min_calls=5, failure_rate=0.5,
+                 reset_timeout=30, half_open_max_calls=1, ignored_exceptions=()):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        # Ошибки клиента (неверные данные) не говорят о том, что сервис лежит
+        self.ignored_exceptions = ignored_exceptions
+
+        self.state = CLOSED
+        self._results = deque(maxlen=window)  # True = успех
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.counters = {"success": 0, "failure": 0, "rejected": 0, "opened": 0}
+
+    def allow(self):
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.counters["rejected"] += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probes = 0
+
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    self.counters["rejected"] += 1
+                    return False
+                self._probes += 1
+            return True
+
+    def is_open(self):
+        """Цепь разомкнута и пробный вызов еще не положен (без изменения состояния, в отличие от allow)"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.counters["success"] += 1
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._results.clear()
+            self._results.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            self.counters["failure"] += 1
+            self._results.append(False)
+            if self.state == HALF_OPEN:
+                self._trip()
+                return
+            failures = self._results.count(False)
+            if len(self._results) >= self.min_calls and failures / len(self._results) >= self.failure_rate:
+                self._trip()
+
+    def release(self):
+        """Вызов прерван без результата (клиент ушел, SystemExit): вернуть пробный слот, ничего не засчитывая"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _trip(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.counters["opened"] += 1
+
+    def call(self, fn, *args, **kwargs):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name}: сервис временно недоступен")
+        try:
+            result = fn(*args, **kwargs)
+        except self.ignored_exceptions:
+            self.record_success()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def status(self):
+        with self._lock:
+            calls = len(self._results)
+            return {
+                "state": self.state,
+                "failure_rate": round(self._results.count(False) / calls, 2) if calls else 0.0,
+                "window_calls": calls,
+                **self.counters
+            }
+
+
+breakers = {}
+_configs = {}  # name -> kwargs, с которыми предохранитель создан
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name, **kwargs):
+    """
+    Один предохранитель на зависимость на весь процесс.
+    Без kwargs — просто получить существующий; с другими kwargs, чем при создании, —
+    ValueError (иначе настройки молча зависели бы от порядка импорта модулей).
+    """
+    with _registry_lock:
+        if name not in breakers:
+            breakers[name] = CircuitBreaker(name, **kwargs)
+            _configs[name] = kwargs
+        elif kwargs and kwargs != _configs[name]:
+            raise ValueError(f"Предохранитель {name} уже создан с другими настройками: {_configs[name]}")
+        return breakers[name]
@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+from app.extensions import db
+from app.models import S3DeletionOutbox
+
+BATCH_SIZE = 1000      # Лимит delete_objects за один вызов
+MAX_BACKOFF = 3600     # Не реже раза в час для "застрявших" ключей
+CLAIM_LEASE = 300      # Сколько взятая воркером пачка скрыта от остальных
+
+
+class S3DeletionQueue:
+    """
+    Удаление файлов из S3 вне HTTP-запроса.
+    Ключи сначала попадают в таблицу s3_deletion_outbox (переживает рестарт),
+    фоновый поток забирает их пачками и удаляет через delete_objects с повторами.
+    """
+
+    def __init__(self, s3_service):
+        self.s3 = s3_service
+        self._wakeup = threading.Event()
+
+    def enqueue(self, file_key):
+        """Добавляет ключ в текущую сессию — коммит делает вызывающий код"""
+        if file_key:
+            db.session.add(S3DeletionOutbox(file_key=file_key))
+
+    def wake(self):
+        self._wakeup.set()
+
+    def process_batch(self, limit=BATCH_SIZE):
+        """Одна пачка: удаляем готовые к обработке ключи. Возвращает число удаленных"""
+        rows = self._claim(limit)
+        if not rows:
+            return 0
+
+        try:
+            failed = self.s3.delete_files([r.file_key for r in rows])
+        except Exception as e:
+            # S3 недоступен целиком — откладываем всю пачку
+            failed = {r.file_key: str(e) for r in rows}
+
+        now = datetime.utcnow()
+        done = [r.id for r in rows if r.file_key not in failed]
+        retries = [{
+            "id": r.id,
+            "attempts": r.attempts + 1,
+            "last_error": str(failed[r.file_key])[:500],
+            "next_attempt_at": now + timedelta(seconds=min(2 ** (r.attempts + 1), MAX_BACKOFF)),
+        } for r in rows if r.file_key in failed]
+        if done:
+            db.session.execute(delete(S3DeletionOutbox).where(S3DeletionOutbox.id.in_(done)))
+        if retries:
+            db.session.execute(update(S3DeletionOutbox), retries)  # bulk UPDATE по первичному ключу
+        db.session.commit()
+        return len(done)
+
+    def start(self, app, interval=30):
+        """Фоновый поток: срабатывает по wake() после удаления тренировки или раз в interval секунд"""
+        def loop():
+            while True:
+                self._wakeup.wait(interval)
+                self._wakeup.clear()
+                with app.app_context():
+                    try:
+                        # Пачки по 1000, пока очередь не опустеет
+                        while self.process_batch() == BATCH_SIZE:
+                            pass
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Ошибка очереди удаления S3: {e}")
+
+        threading.Thread(target=loop, name="s3-deletion-queue", daemon=True).start()
+
+    def _claim(self, limit):
+        """
+        Забрать пачку себе: поток есть в каждом воркере gunicorn, поэтому строки
+        «арендуются» условным UPDATE — next_attempt_at сдвигается на CLAIM_LEASE, и другие
+        воркеры их не видят. Аренда фиксируется до вызова S3; если процесс упадет,
+        строки снова станут доступны через CLAIM_LEASE.
+        """
+        now = datetime.utcnow()
+        ready = select(S3DeletionOutbox.id) \
+            .where(S3DeletionOutbox.next_attempt_at <= now) \
+            .order_by(S3DeletionOutbox.id) \
+            .limit(limit)
+        if db.engine.dialect.name == 'postgresql':
+            # Не ждать строки, которые прямо сейчас забирает другой воркер
+            ready = ready.with_for_update(skip_locked=True)
+        # Повторная проверка next_attempt_at в самом UPDATE: строку, уже взятую другим, не заберем
+        stmt = update(S3DeletionOutbox) \
+            .where(S3DeletionOutbox.id.in_(ready.scalar_subquery()),
+                   S3DeletionOutbox.next_attempt_at <= now) \
+            .values(next_attempt_at=now + timedelta(seconds=CLAIM_LEASE)) \
+            .returning(S3DeletionOutbox.id, S3DeletionOutbox.file_key, S3DeletionOutbox.attempts) \
+            .execution_options(synchronize_session=False)
+        rows = db.session.execute(stmt).all()
+        db.session.commit()
+        return rows
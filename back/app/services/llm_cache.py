@@ -0,0 +1,80 @@
+import hashlib
+import json
+import random
+import re
+import threading
+from collections import OrderedDict
+from app.extensions import db
+from app.models import LLMResponse
+
+
+class LLMResponseCache:
+    """
+    Кэш ответов ИИ по содержимому промпта.
+    Промпт зависит только от days_since, last_int и сценария, поэтому у тысяч
+    пользователей он одинаковый. На каждый ключ копим несколько вариантов текста
+    (чтобы советы не были под копирку) и дальше Ollama не вызываем.
+    """
+
+    def __init__(self, max_keys=1000, variants_per_key=3):
+        self.max_keys = max_keys
+        self.variants_per_key = variants_per_key
+        self._lru = OrderedDict()  # key -> [message, ...]
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(prompt, model, options):
+        # Отступы и переносы в f-строке промпта на смысл не влияют
+        normalized = re.sub(r"\s+", " ", prompt).strip()
+        raw = json.dumps([normalized, model, options], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def load(self):
+        """Восстанавливаем пул вариантов из SQLite после рестарта"""
+        rows = LLMResponse.query.order_by(LLMResponse.id.desc()).limit(self.max_keys * self.variants_per_key).all()
+        with self._lock:
+            self._lru.clear()
+            for row in reversed(rows):
+                self._remember(row.prompt_hash, row.message)
+
+    def get(self, key):
+        """Случайный вариант, если пул по ключу уже набран; иначе None (нужен новый вариант)"""
+        with self._lock:
+            variants = self._lru.get(key)
+            if variants and len(variants) >= self.variants_per_key:
+                self._lru.move_to_end(key)
+                self.stats["hits"] += 1
+                return random.choice(variants)
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, message):
+        with self._lock:
+            if message in self._lru.get(key, []):
+                return
+            self._remember(key, message)
+        db.session.add(LLMResponse(prompt_hash=key, message=message))
+        db.session.commit()
+
+    def _remember(self, key, message):
+        variants = self._lru.setdefault(key, [])
+        if message not in variants:
+            variants.append(message)
+            del variants[:-self.variants_per_key]
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_keys:
+            self._lru.popitem(last=False)
+
+    def status(self):
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return {
+                "keys": len(self._lru),
+                "hit_rate": round(self.stats["hits"] / total, 2) if total else 0.0,
+                "ollama_calls_saved": self.stats["hits"],
+                **self.stats
+            }
+
+
+llm_cache = LLMResponseCache()
@@ -0,0 +1,156 @@
+"""
+Полнотекстовый поиск по заметкам (SQLite FTS5) вместо ILIKE '%слово%'.
+
+Индексы training_fts и diary_fts — external content: текст хранится только в
+исходной таблице, FTS держит инвертированный индекс, синхронизацию делают триггеры.
+user_id тоже проиндексирован: фильтр по пользователю выполняется внутри MATCH,
+а не после выборки всех совпадений по базе.
+"""
+import html
+import re
+from sqlalchemy import func, literal_column, table, column, select
+from app.extensions import db
+
+# Таблица с заметками -> имя FTS-индекса
+FTS_TABLES = {
+    "training": "training_fts",
+    "diary_entry": "diary_fts",
+}
+
+SNIPPET_TOKENS = 12
+# snippet() размечает совпадения служебными символами: текст заметки экранируется
+# как HTML, и только потом они заменяются на <mark> (иначе заметка с <img onerror=…>
+# попала бы в браузер как разметка)
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+
+# Все слова ищем по префиксу основы. Без префиксного индекса FTS5 для «трениров*»
+# сливает списки документов всех слов с этим началом — для частых слов это дольше ILIKE
+PREFIX_INDEX = "3 4 5 6 7 8 9 10"
+
+# Частые окончания русских слов (по убыванию длины). Полноценного стеммера в SQLite нет,
+# поэтому отрезаем окончание и ищем по префиксу: «тренировки» -> «тренировк*»
+_ENDINGS = sorted((
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ешь", "ете", "ишь", "ите",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей", "ом", "ем", "ах", "ях", "ов", "ев",
+    "ам", "ям", "ую", "юю", "ть", "ла", "ли", "ло",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+), key=len, reverse=True)
+_MIN_STEM = 3
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_enabled():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def ensure_fts():
+    """
+    Создает FTS-индексы и триггеры, если их нет, и заполняет индекс по уже
+    существующим строкам. Триггер — признак, что индекс синхронизирован с таблицей
+    (если таблицу пересоздали, триггеры пропали вместе с ней — индекс строим заново).
+    """
+    if not fts_enabled():
+        return
+    with db.engine.begin() as conn:
+        for source, fts in FTS_TABLES.items():
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f"{fts}_ai",)
+            ).first()
+            if exists:
+                continue
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {fts}")
+            conn.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5(note, user_id, content='{source}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='{PREFIX_INDEX}')"
+            )
+            conn.exec_driver_sql(f"""
+                CREATE TRIGGER {fts}_ai AFTER INSERT ON {source} BEGIN
+                    INSERT INTO {fts}(rowid, note, user_id) VALUES (new.id, new.note, new.user_id);
+                END""")
+            conn.exec_driver_sql(f"""
+                CREATE TRIGGER {fts}_ad AFTER DELETE ON {source} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, note, user_id) VALUES ('delete', old.id, old.note, old.user_id);
+                END""")
+            conn.exec_driver_sql(f"""
+                CREATE TRIGGER {fts}_au AFTER UPDATE OF note, user_id ON {source} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, note, user_id) VALUES ('delete', old.id, old.note, old.user_id);
+                    INSERT INTO {fts}(rowid, note, user_id) VALUES (new.id, new.note, new.user_id);
+                END""")
+            conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _stem(word):
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def to_match_query(search, user_id=None):
+    """
+    Строка поиска -> выражение FTS5: все слова (AND), каждое по префиксу основы.
+    Пользовательский ввод целиком экранируется кавычками — синтаксис FTS5 из него не пройдет.
+    """
+    words = [_stem(w.lower()) for w in _WORD_RE.findall(search or "")]
+    if not words:
+        return None
+    terms = " ".join(f'"{w}"*' for w in words)
+    match = f"note:({terms})"
+    if user_id is not None:
+        match = f'user_id:"{int(user_id)}" AND {match}'
+    return match
+
+
+def _fts_table(model):
+    return table(FTS_TABLES[model.__tablename__], column("rowid"))
+
+
+def apply_search(query, model, search, user_id=None, rank=False):
+    """
+    Добавляет к запросу по model (Training / DiaryEntry) поиск по заметкам.
+    rank=True — сортировка по релевантности (bm25) вместо текущей.
+    """
+    if not search:
+        return query
+    if not fts_enabled():
+        # PostgreSQL и прочие — как раньше
+        return query.filter(model.note.ilike(f"%{search}%"))
+
+    match = to_match_query(search, user_id)
+    if match is None:
+        return query
+    fts = _fts_table(model)
+    name = literal_column(fts.name)
+    # MATCH выполняется один раз (MATERIALIZED), иначе для COUNT(*) пагинации планировщик
+    # может пойти от training и повторять полнотекстовый поиск на каждую строку
+    columns = [fts.c.rowid.label("id")]
+    if rank:
+        # Вес 0 у колонки user_id: она нужна только для фильтра
+        columns.append(func.bm25(name, 1.0, 0.0).label("rank"))
+    hits = select(*columns).where(name.op("MATCH")(match)) \
+        .cte(f"{fts.name}_hits").prefix_with("MATERIALIZED")
+    query = query.join(hits, hits.c.id == model.id)
+    if rank:
+        query = query.order_by(None).order_by(hits.c.rank, model.id.desc())
+    return query
+
+
+def snippets(model, ids, search, user_id=None):
+    """Фрагменты заметок с подсветкой найденных слов: {id: '...<mark>слово</mark>...'} (готовый HTML)"""
+    if not ids or not search or not fts_enabled():
+        return {}
+    match = to_match_query(search, user_id)
+    if match is None:
+        return {}
+    fts = _fts_table(model)
+    name = literal_column(fts.name)
+    rows = db.session.execute(
+        select(fts.c.rowid, func.snippet(name, 0, _MARK_OPEN, _MARK_CLOSE, "…", SNIPPET_TOKENS))
+        .where(name.op("MATCH")(match), fts.c.rowid.in_(ids))
+    )
+    return {row_id: _highlight(text) for row_id, text in rows}
+
+
+def _highlight(text):
+    escaped = html.escape(text or "")
+    return escaped.replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
@@ -0,0 +1,105 @@
+import hashlib
+import threading
+import time
+from datetime import datetime
+from flask import Response, request
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.models import CacheVersion
+
+
+class ResponseCache:
+    """
+    Готовые тела ответов (байты + ETag) для редко меняющихся публичных эндпоинтов.
+
+    У ресурса есть счетчик версии в таблице cache_version: маршруты записи увеличивают
+    его (bump), а воркеры gunicorn раз в sync_interval секунд перечитывают все версии
+    одним запросом. Пока версия не изменилась, ответ отдается из памяти — без запросов
+    к БД и без сериализации, а If-None-Match с тем же ETag получает 304.
+    """
+
+    def __init__(self, sync_interval=5):
+        # Как быстро воркер замечает изменения, сделанные ДРУГИМИ воркерами
+        self.sync_interval = sync_interval
+        self._versions = {}  # name -> (version, updated_at)
+        self._entries = {}   # name -> (version, body, etag, updated_at)
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Сброс при старте приложения (БД могли пересоздать)"""
+        with self._lock:
+            self._versions.clear()
+            self._entries.clear()
+            self._synced_at = 0.0
+
+    def sync(self):
+        rows = db.session.query(CacheVersion.name, CacheVersion.version, CacheVersion.updated_at).all()
+        with self._lock:
+            self._versions = {name: (version, updated_at) for name, version, updated_at in rows}
+            self._synced_at = time.monotonic()
+
+    def version(self, name):
+        if time.monotonic() - self._synced_at >= self.sync_interval:
+            self.sync()
+        return self._versions.get(name, (0, None))
+
+    def bump(self, name):
+        """
+        Данные ресурса изменились. Вызывается до commit — версия растет в той же
+        транзакции, что и сама запись.
+        """
+        now = datetime.utcnow()
+        dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+        table = CacheVersion.__table__
+        stmt = dialect.insert(table).values(name=name, version=1, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={"version": table.c.version + 1, "updated_at": now}
+        )
+        db.session.execute(stmt)
+        with self._lock:
+            self._entries.pop(name, None)
+            self._synced_at = 0.0  # следующий запрос этого воркера перечитает версии
+
+    def get(self, name, build):
+        """(body, etag, updated_at) текущей версии; build() вызывается только при ее смене"""
+        version, updated_at = self.version(name)
+        entry = self._entries.get(name)
+        if entry is None or entry[0] != version:
+            body = build()
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            # Строгий ETag — хеш байтов тела: одинаков во всех воркерах при одинаковых данных
+            etag = hashlib.sha1(body).hexdigest()
+            entry = (version, body, etag, updated_at)
+            with self._lock:
+                self._entries[name] = entry
+        return entry[1:]
+
+    def status(self):
+        with self._lock:
+            return {name: entry[0] for name, entry in self._entries.items()}
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(name, build, mimetype="application/json", max_age=0, stale_while_revalidate=0):
+    """
+    Ответ из response_cache с ETag / Last-Modified / Cache-Control;
+    на If-None-Match / If-Modified-Since с актуальным значением — 304 без тела.
+    """
+    body, etag, updated_at = response_cache.get(name, build)
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    if updated_at:
+        response.last_modified = updated_at
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if stale_while_revalidate:
+        # nginx (proxy_cache_background_update) отдает устаревшую копию, пока обновляет ее в фоне
+        response.cache_control["stale-while-revalidate"] = str(stale_while_revalidate)
+    if not max_age:
+        response.cache_control.must_revalidate = True
+    return response.make_conditional(request)
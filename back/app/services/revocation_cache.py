@@ -0,0 +1,95 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from app.models import TokenBlocklist
+
+# created_at ставится до commit, а id в PostgreSQL выдаются не в порядке commit: отзыв,
+# закоммиченный позже очередной синхронизации, может иметь более раннее время.
+# Поэтому каждая синхронизация перечитывает и это окно перед прошлой
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+class RevocationCache:
+    """
+    Кэш отозванных JTI в памяти воркера.
+    Загружается из token_blocklist при старте и пополняется при logout,
+    поэтому проверка токена на каждый @jwt_required() не ходит в БД.
+    """
+
+    def __init__(self, max_size=100_000, sync_interval=5):
+        self.max_size = max_size
+        # Как часто подтягивать отзывы, сделанные ДРУГИМИ воркерами gunicorn
+        self.sync_interval = sync_interval
+        self._entries = {}  # jti -> expires
+        self._synced_from = None  # время начала прошлой синхронизации (UTC)
+        self._synced_at = 0.0
+        # Если кэш переполнился, отрицательному ответу доверять нельзя
+        self._overflow = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Полная загрузка актуальных отзывов из БД"""
+        with self._lock:
+            self._entries.clear()
+            self._synced_from = None
+            self._overflow = False
+        self.sync()
+
+    def sync(self):
+        """Догружаем строки, появившиеся с прошлой синхронизации (с запасом SYNC_OVERLAP)"""
+        started = datetime.utcnow()
+        query = TokenBlocklist.query \
+            .with_entities(TokenBlocklist.jti, TokenBlocklist.expires) \
+            .filter(TokenBlocklist.revoked.is_(True),
+                    TokenBlocklist.expires > started)
+        if self._synced_from is not None:
+            query = query.filter(TokenBlocklist.created_at >= self._synced_from - SYNC_OVERLAP)
+        rows = query.all()
+        with self._lock:
+            # Повторно прочитанные строки окна просто перезаписываются
+            for jti, expires in rows:
+                self._put(jti, expires)
+            self._synced_from = started
+            self._synced_at = time.monotonic()
+
+    def add(self, jti, expires):
+        with self._lock:
+            self._put(jti, expires)
+
+    def is_revoked(self, jti):
+        if time.monotonic() - self._synced_at >= self.sync_interval:
+            self.sync()
+
+        with self._lock:
+            expires = self._entries.get(jti)
+            if expires is not None:
+                if expires > datetime.utcnow():
+                    return True
+                # Срок жизни токена вышел — запись больше не нужна
+                del self._entries[jti]
+                return False
+            overflow = self._overflow
+
+        if not overflow:
+            return False
+        # Переполнение: честно проверяем по БД
+        return TokenBlocklist.query.filter_by(jti=jti, revoked=True).first() is not None
+
+    def _put(self, jti, expires):
+        if jti not in self._entries and len(self._entries) >= self.max_size:
+            self._purge_expired()
+            if len(self._entries) >= self.max_size:
+                self._overflow = True
+                return
+        self._entries[jti] = expires
+
+    def _purge_expired(self):
+        now = datetime.utcnow()
+        for jti in [j for j, exp in self._entries.items() if exp <= now]:
+            del self._entries[jti]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+revocation_cache = RevocationCache()
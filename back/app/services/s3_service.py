@@ -1,20 +1,51 @@
 import boto3
+import threading
+import time
+from collections import OrderedDict
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
+from botocore.exceptions import ClientError
+from app.config import Config as AppConfig
+from app.services.circuit_breaker import get_breaker
 import os
 
+URL_EXPIRES = 3600       # Срок жизни presigned-ссылки (сек)
+URL_REFRESH_MARGIN = 300 # Переподписываем за 5 минут до истечения
+URL_CACHE_SIZE = 10_000
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class _LimitedStream:
+    """Отдает входной поток кусками и обрывает загрузку, как только превышен лимит"""
+    def __init__(self, stream, max_size):
+        self.stream = stream
+        self.max_size = max_size
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_size:
+            raise UploadTooLarge("Файл слишком большой")
+        return chunk
+
+
 class S3Service:
-    def __init__(self):
-        # Данные для входа
-        self.key_id = 'minioadmin'
-        self.secret_key = 'minioadmin'
-        self.bucket = 'sportcenter-bucket'
+    def __init__(self, part_size=5 * 1024 * 1024, max_concurrency=4, breaker=None):
+        # Данные для входа (переменные окружения, см. app/config.py)
+        self.key_id = AppConfig.MINIO_ACCESS_KEY
+        self.secret_key = AppConfig.MINIO_SECRET_KEY
+        self.bucket = AppConfig.MINIO_BUCKET
         self.region = 'us-east-1'
 
         # 1. Клиент для ВНУТРЕННИХ операций (загрузка/удаление)
-        # Он общается с контейнером напрямую по имени 'minio'
+        # Он общается с контейнером напрямую (в Docker — по имени 'minio')
         self.s3_internal = boto3.client(
             's3',
-            endpoint_url='http://minio:9000',
+            endpoint_url=AppConfig.MINIO_ENDPOINT,
             aws_access_key_id=self.key_id,
             aws_secret_access_key=self.secret_key,
             config=Config(signature_version='s3v4'),
@@ -27,19 +58,36 @@ class S3Service:
         # но важен для текста ссылки.
         self.s3_external = boto3.client(
             's3',
-            endpoint_url='http://localhost:9000', 
+            endpoint_url=AppConfig.MINIO_PUBLIC_ENDPOINT,
             aws_access_key_id=self.key_id,
             aws_secret_access_key=self.secret_key,
             config=Config(signature_version='s3v4'),
             region_name=self.region
         )
 
+        # Предохранитель для MinIO: при падении хранилища запросы сразу получают ошибку.
+        # Подпись ссылок (get_urls) локальная и через него не идет
+        self.breaker = breaker or get_breaker("minio", ignored_exceptions=(UploadTooLarge,))
+
+        # Настройки multipart-загрузки (S3 не принимает части меньше 5МБ, кроме последней)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=part_size,
+            max_concurrency=max_concurrency
+        )
+
+        # Кэш подписанных ссылок: file_key -> (url, момент, когда пора переподписать)
+        self._url_cache = OrderedDict()
+        self._url_lock = threading.Lock()
+        self.url_cache_stats = {"hits": 0, "misses": 0}
+
     def upload_file(self, file_data, filename, content_type):
         """Используем внутренний клиент"""
         if not content_type.startswith('image/'):
             raise ValueError("Разрешены только изображения")
             
-        self.s3_internal.upload_fileobj(
+        self.breaker.call(
+            self.s3_internal.upload_fileobj,
             file_data, 
             self.bucket, 
             filename, 
@@ -47,24 +95,131 @@ class S3Service:
         )
         return filename
 
+    def upload_stream(self, stream, filename, content_type, max_size):
+        """
+        Потоковая загрузка: тело запроса читается кусками и сразу уходит частями
+        multipart upload, не сохраняясь целиком на диск/в память.
+        При превышении max_size загрузка прерывается (незавершенный multipart отменяется).
+        """
+        if not content_type or not content_type.startswith('image/'):
+            raise ValueError("Разрешены только изображения")
+
+        self.breaker.call(
+            self.s3_internal.upload_fileobj,
+            _LimitedStream(stream, max_size),
+            self.bucket,
+            filename,
+            ExtraArgs={'ContentType': content_type},
+            Config=self.transfer_config
+        )
+        return filename
+
+    def get_upload_post(self, key, content_type, max_size, expires=600):
+        """
+        Presigned POST для загрузки напрямую из браузера в бакет (байты не идут через API).
+        Подписываем внешним клиентом — форма отправляется на 'localhost'.
+        """
+        if not content_type or not content_type.startswith('image/'):
+            raise ValueError("Разрешены только изображения")
+
+        return self.s3_external.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_size]
+            ],
+            ExpiresIn=expires
+        )
+
+    def file_exists(self, key):
+        """HEAD-запрос: объект действительно загружен в бакет"""
+        def head():
+            try:
+                self.s3_internal.head_object(Bucket=self.bucket, Key=key)
+                return True
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                    return False
+                raise
+
+        return self.breaker.call(head)
+
     def get_url(self, key):
         """Используем внешний клиент для правильной подписи"""
         if not key: 
             return None
-            
+        return self.get_urls([key])[key]
+
+    def get_urls(self, keys):
+        """
+        Ссылки для пачки ключей (например, для страницы тренировок).
+        Подписываем только те, которых нет в кэше или которые скоро истекут.
+        """
+        now = time.monotonic()
+        result, missing = {}, []
+        with self._url_lock:
+            for key in dict.fromkeys(k for k in keys if k):
+                cached = self._url_cache.get(key)
+                if cached and cached[1] > now:
+                    self._url_cache.move_to_end(key)
+                    result[key] = cached[0]
+                    self.url_cache_stats["hits"] += 1
+                else:
+                    missing.append(key)
+                    self.url_cache_stats["misses"] += 1
+
         # Генерируем ссылку через клиента, который "думает", что сервер на localhost
         # Подпись будет создана корректно для твоего браузера
-        url = self.s3_external.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': self.bucket, 'Key': key}, 
-            ExpiresIn=3600
-        )
-        return url
+        signed = {
+            key: self.s3_external.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket, 'Key': key}, 
+                ExpiresIn=URL_EXPIRES
+            )
+            for key in missing
+        }
+
+        refresh_at = now + URL_EXPIRES - URL_REFRESH_MARGIN
+        with self._url_lock:
+            for key, url in signed.items():
+                self._url_cache[key] = (url, refresh_at)
+                self._url_cache.move_to_end(key)
+            while len(self._url_cache) > URL_CACHE_SIZE:
+                self._url_cache.popitem(last=False)
+
+        result.update(signed)
+        return result
 
     def delete_file(self, key):
         """Используем внутренний клиент"""
         if key:
+            with self._url_lock:
+                self._url_cache.pop(key, None)
             try:
-                self.s3_internal.delete_object(Bucket=self.bucket, Key=key)
+                self.breaker.call(self.s3_internal.delete_object, Bucket=self.bucket, Key=key)
             except Exception as e:
-                print(f"Ошибка удаления: {e}")
\ No newline at end of file
+                print(f"Ошибка удаления: {e}")
+
+    def delete_files(self, keys):
+        """
+        Пакетное удаление (delete_objects, до 1000 ключей за вызов).
+        Возвращает {key: текст ошибки} для ключей, которые удалить не удалось.
+        """
+        keys = [k for k in keys if k]
+        with self._url_lock:
+            for key in keys:
+                self._url_cache.pop(key, None)
+
+        failed = {}
+        for i in range(0, len(keys), 1000):
+            chunk = keys[i:i + 1000]
+            response = self.breaker.call(
+                self.s3_internal.delete_objects,
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': k} for k in chunk], 'Quiet': True}
+            )
+            for error in response.get('Errors', []):
+                failed[error['Key']] = error.get('Message', error.get('Code'))
+        return failed
@@ -0,0 +1,56 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+
+THUMB_SIZE = (480, 480)  # Карточка в Diary.tsx не шире ~300px, берем с запасом под retina
+THUMB_QUALITY = 75
+
+
+def thumb_key(file_key):
+    """Ключ превью рядом с оригиналом: user_1/abc.jpg -> user_1/abc.thumb.webp"""
+    if not file_key:
+        return None
+    base = file_key.rsplit('.', 1)[0] if '.' in file_key.rsplit('/', 1)[-1] else file_key
+    return f"{base}.thumb.webp"
+
+
+def make_thumbnail(data, size=THUMB_SIZE, fmt='WEBP'):
+    """Уменьшенная копия изображения (с учетом EXIF-поворота с телефона)"""
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(size)
+        if fmt == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        out = io.BytesIO()
+        img.save(out, fmt, quality=THUMB_QUALITY)
+        return out.getvalue()
+
+
+class ThumbnailService:
+    """Генерация превью в пуле потоков сразу после загрузки фото"""
+
+    def __init__(self, s3_service, workers=2):
+        self.s3 = s3_service
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbs")
+
+    def submit(self, file_key):
+        if file_key:
+            return self._pool.submit(self.generate, file_key)
+
+    def generate(self, file_key):
+        try:
+            original = self.s3.breaker.call(
+                self.s3.s3_internal.get_object, Bucket=self.s3.bucket, Key=file_key)
+            data = make_thumbnail(original['Body'].read())
+            key = thumb_key(file_key)
+            self.s3.breaker.call(
+                self.s3.s3_internal.put_object,
+                Bucket=self.s3.bucket,
+                Key=key,
+                Body=data,
+                ContentType='image/webp'
+            )
+            return key
+        except Exception as e:
+            print(f"Ошибка генерации превью {file_key}: {e}")
+            return None
@@ -0,0 +1,58 @@
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func
+from app.extensions import db
+from app.models import TokenBlocklist
+
+# Метрика последней чистки (размер таблицы до/после)
+last_sweep = {}
+
+
+def purge_expired_tokens(batch_size=500):
+    """Удаляет истекшие записи token_blocklist пачками, чтобы не держать долгую блокировку"""
+    now = datetime.utcnow()
+    before = db.session.query(func.count(TokenBlocklist.id)).scalar()
+
+    deleted = 0
+    while True:
+        ids = db.session.query(TokenBlocklist.id) \
+            .filter(TokenBlocklist.expires <= now) \
+            .limit(batch_size) \
+            .subquery()
+        count = TokenBlocklist.query \
+            .filter(TokenBlocklist.id.in_(db.select(ids.c.id))) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+        deleted += count
+        if count < batch_size:
+            break
+
+    after = db.session.query(func.count(TokenBlocklist.id)).scalar()
+    last_sweep.update({
+        "at": now.isoformat(),
+        "rows_before": before,
+        "rows_after": after,
+        "deleted": deleted
+    })
+    current_app.logger.info(
+        "token_blocklist purge: %s -> %s rows (deleted %s)", before, after, deleted
+    )
+    return dict(last_sweep)
+
+
+def start_purge_timer(app, interval=3600, batch_size=500):
+    """Фоновая чистка внутри процесса (daemon-поток)"""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            with app.app_context():
+                try:
+                    purge_expired_tokens(batch_size)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Ошибка чистки token_blocklist: {e}")
+
+    threading.Thread(target=loop, name="token-purge", daemon=True).start()
+    return stop
@@ -0,0 +1,209 @@
+"""
+Модель «острая/хроническая нагрузка» (ACWR) на экспоненциальных скользящих средних.
+
+Нагрузка тренировки — session-RPE: длительность * интенсивность.
+EWMA линейна по нагрузкам: A(day) = sum(lambda * load_i * (1 - lambda) ** (day - day_i)),
+поэтому добавление и удаление тренировки (в том числе задним числом) — это
+одно слагаемое с нужным знаком, без пересчета истории.
+"""
+from datetime import date
+from sqlalchemy import func
+from app.extensions import db
+from app.models import Training, TrainingLoadState
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+ACUTE_LAMBDA = 2 / (ACUTE_DAYS + 1)
+CHRONIC_LAMBDA = 2 / (CHRONIC_DAYS + 1)
+
+# Значения по умолчанию — как в add_training
+DEFAULT_DURATION = 30
+DEFAULT_INTENSITY = 5
+
+# Зоны ACWR: < 0.8 недогруз, 0.8–1.3 норма, 1.3–1.5 осторожно, > 1.5 риск травмы
+ACWR_CAUTION = 1.3
+ACWR_DANGER = 1.5
+
+
+def session_load(duration, intensity):
+    return (duration or DEFAULT_DURATION) * (intensity or DEFAULT_INTENSITY)
+
+
+def _decay(days, lam):
+    return (1 - lam) ** days
+
+
+def _shift(state, day):
+    """Сдвинуть опорный день вперед (затухание без новых нагрузок)"""
+    if day > state.ref_day:
+        gap = (day - state.ref_day).days
+        state.acute *= _decay(gap, ACUTE_LAMBDA)
+        state.chronic *= _decay(gap, CHRONIC_LAMBDA)
+        state.ref_day = day
+
+
+def _add_load(state, day, load):
+    _shift(state, day)
+    age = (state.ref_day - day).days
+    # max(0) — от накопленной ошибки округления после удалений
+    state.acute = max(0.0, state.acute + ACUTE_LAMBDA * load * _decay(age, ACUTE_LAMBDA))
+    state.chronic = max(0.0, state.chronic + CHRONIC_LAMBDA * load * _decay(age, CHRONIC_LAMBDA))
+
+
+def _latest_training(user_id, exclude_id=None):
+    # Одна выборка по индексу ix_training_user_date
+    query = db.session.query(Training.date, Training.intensity).filter(Training.user_id == user_id)
+    if exclude_id is not None:
+        query = query.filter(Training.id != exclude_id)
+    return query.order_by(Training.date.desc(), Training.id.desc()).first()
+
+
+def _first_day(user_id, exclude_id=None):
+    query = db.session.query(func.min(Training.date)).filter(Training.user_id == user_id)
+    if exclude_id is not None:
+        query = query.filter(Training.id != exclude_id)
+    # min() сохраняет тип колонки — datetime в обеих СУБД
+    first = query.scalar()
+    return first.date() if first else None
+
+
+def record(training, sign=1):
+    """
+    Учесть тренировку в состоянии нагрузки (sign=-1 — при удалении).
+    Выполняется в той же транзакции, что и запись/удаление тренировки.
+    """
+    user_id = int(training.user_id)
+    # Чтение-изменение-запись строки состояния: в PostgreSQL строка блокируется
+    # (SELECT ... FOR UPDATE) до конца транзакции, параллельные запросы того же
+    # пользователя ждут и читают уже обновленное состояние. SQLite FOR UPDATE
+    # не поддерживает, но записи там и так сериализуются блокировкой базы.
+    state = db.session.get(TrainingLoadState, user_id, with_for_update=True, populate_existing=True)
+    if state is None:
+        # Первое обращение — собираем состояние по истории
+        # (новую тренировку не считаем, она добавится ниже; удаляемую считаем — ниже она вычтется)
+        db.session.flush()
+        state = build(user_id, exclude_id=training.id if sign > 0 else None)
+
+    day = training.date.date()
+    _add_load(state, day, sign * session_load(training.duration, training.intensity))
+
+    if sign > 0:
+        state.first_day = min(state.first_day or day, day)
+        if state.last_training_at is None or training.date >= state.last_training_at:
+            state.last_training_at = training.date
+            state.last_intensity = training.intensity
+    elif training.date >= (state.last_training_at or training.date):
+        # Удалили последнюю тренировку — берем предыдущую
+        latest = _latest_training(user_id, exclude_id=training.id)
+        state.last_training_at, state.last_intensity = latest if latest else (None, None)
+        if latest is None:
+            state.acute, state.chronic, state.first_day = 0.0, 0.0, None
+    if sign < 0 and state.first_day is not None and day <= state.first_day:
+        # Удалили самую раннюю тренировку — начало истории сдвигается (нужно для ACWR)
+        state.first_day = _first_day(user_id, exclude_id=training.id)
+    return state
+
+
+def _states_from_rows(rows, latest):
+    """rows — (user_id, day, load) по возрастанию дня; latest — {user_id: (date, intensity)}"""
+    states = {}
+    for user_id, day, load in rows:
+        day = _as_date(day)
+        state = states.get(user_id)
+        if state is None:
+            state = states[user_id] = TrainingLoadState(user_id=user_id, ref_day=day, acute=0.0,
+                                                        chronic=0.0, first_day=day)
+        _add_load(state, day, load)
+    for user_id, state in states.items():
+        state.last_training_at, state.last_intensity = latest[user_id]
+    return states
+
+
+def _daily_loads():
+    day = func.date(Training.date)
+    load = func.sum(func.coalesce(Training.duration, DEFAULT_DURATION) *
+                    func.coalesce(Training.intensity, DEFAULT_INTENSITY))
+    return db.session.query(Training.user_id, day, load), day
+
+
+def build(user_id, exclude_id=None):
+    """Собрать состояние пользователя по истории тренировок и добавить его в сессию"""
+    query, day = _daily_loads()
+    query = query.filter(Training.user_id == user_id)
+    if exclude_id is not None:
+        query = query.filter(Training.id != exclude_id)
+    rows = query.group_by(Training.user_id, day).order_by(day).all()
+
+    latest = _latest_training(user_id, exclude_id)
+    state = _states_from_rows(rows, {user_id: latest}).get(user_id) or \
+        TrainingLoadState(user_id=user_id, ref_day=date.today(), acute=0.0, chronic=0.0)
+    db.session.add(state)
+    return state
+
+
+def build_missing():
+    """Состояния для всех пользователей с тренировками, у кого их еще нет (старые данные, bulk insert)"""
+    missing = ~db.session.query(TrainingLoadState.user_id) \
+        .filter(TrainingLoadState.user_id == Training.user_id).exists()
+    query, day = _daily_loads()
+    rows = query.filter(missing).group_by(Training.user_id, day).order_by(Training.user_id, day).all()
+    if not rows:
+        return 0
+
+    latest_rows = db.session.query(
+        Training.user_id, Training.date, Training.intensity,
+        func.row_number().over(partition_by=Training.user_id,
+                               order_by=(Training.date.desc(), Training.id.desc())).label("rn")
+    ).filter(missing).subquery()
+    latest = {u: (d, i) for u, d, i, _ in db.session.query(latest_rows).filter(latest_rows.c.rn == 1)}
+
+    states = _states_from_rows(rows, latest)
+    db.session.add_all(states.values())
+    db.session.commit()
+    return len(states)
+
+
+def get_state(user_id):
+    """Состояние из таблицы (одна выборка по первичному ключу); None — тренировок нет"""
+    state = db.session.get(TrainingLoadState, user_id)
+    if state is None:
+        state = build(user_id)
+        db.session.commit()
+    return state if state.last_training_at else None
+
+
+def _as_date(value):
+    # func.date() в SQLite возвращает строку, в PostgreSQL — date
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def acwr_zone(acwr):
+    if acwr is None:
+        return "unknown"
+    if acwr < 0.8:
+        return "undertraining"
+    if acwr <= ACWR_CAUTION:
+        return "optimal"
+    if acwr <= ACWR_DANGER:
+        return "caution"
+    return "danger"
+
+
+def snapshot(state, today=None):
+    """Значения на сегодня (с затуханием от ref_day), ACWR — только при истории >= 28 дней"""
+    today = today or date.today()
+    gap = max((today - state.ref_day).days, 0)
+    acute = state.acute * _decay(gap, ACUTE_LAMBDA)
+    chronic = state.chronic * _decay(gap, CHRONIC_LAMBDA)
+    enough_history = state.first_day is not None and (today - state.first_day).days >= CHRONIC_DAYS
+    acwr = round(acute / chronic, 2) if enough_history and chronic > 0 else None
+    return {
+        "acute_load": round(acute, 1),
+        "chronic_load": round(chronic, 1),
+        "acwr": acwr,
+        "zone": acwr_zone(acwr),
+        "days_since": (today - state.last_training_at.date()).days,
+        "last_intensity": state.last_intensity if state.last_intensity is not None else DEFAULT_INTENSITY,
+    }
@@ -0,0 +1,118 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.models import Training, TrainingDailyRollup, Section
+
+ROLLUP_KEY = ['user_id', 'day', 'section_id']
+
+
+def _upsert(values, increments):
+    """INSERT ... ON CONFLICT DO UPDATE (есть и в SQLite, и в PostgreSQL)"""
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    table = TrainingDailyRollup.__table__
+    stmt = dialect.insert(table).values(**values, **increments)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=ROLLUP_KEY,
+        set_={name: table.c[name] + stmt.excluded[name] for name in increments}
+    )
+    db.session.execute(stmt)
+
+
+def record(training, sign=1):
+    """
+    Учесть тренировку в дневной сводке (sign=-1 — при удалении).
+    Выполняется в той же транзакции, что и запись/удаление тренировки.
+    """
+    duration = training.duration or 0
+    intensity = training.intensity or 0
+    _upsert(
+        {"user_id": int(training.user_id), "day": training.date.date(), "section_id": int(training.section_id)},
+        {
+            "sessions": sign,
+            "total_duration": sign * duration,
+            "intensity_sum": sign * intensity,
+            "total_load": sign * duration * intensity,
+        }
+    )
+
+
+def rebuild(user_id=None):
+    """Пересчитать сводку с нуля по сырым тренировкам (для уже существующих данных)"""
+    query = TrainingDailyRollup.query
+    if user_id:
+        query = query.filter_by(user_id=user_id)
+    query.delete(synchronize_session=False)
+
+    day = func.date(Training.date)
+    rows = db.session.query(
+        Training.user_id, day, Training.section_id,
+        func.count(Training.id),
+        func.coalesce(func.sum(Training.duration), 0),
+        func.coalesce(func.sum(Training.intensity), 0),
+        func.coalesce(func.sum(Training.duration * Training.intensity), 0),
+    )
+    if user_id:
+        rows = rows.filter(Training.user_id == user_id)
+    rows = rows.group_by(Training.user_id, day, Training.section_id).all()
+
+    db.session.bulk_insert_mappings(TrainingDailyRollup, [
+        {"user_id": u, "day": _as_date(d), "section_id": s, "sessions": n,
+         "total_duration": dur, "intensity_sum": isum, "total_load": load}
+        for u, d, s, n, dur, isum, load in rows
+    ])
+    db.session.commit()
+    return len(rows)
+
+
+def _as_date(value):
+    # func.date() в SQLite возвращает строку, в PostgreSQL — date
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def _totals(sessions, duration, intensity_sum, load):
+    return {
+        "sessions": sessions,
+        "duration": duration,
+        "avg_intensity": round(intensity_sum / sessions, 1) if sessions else None,
+        "load": load,
+    }
+
+
+def get_stats(user_id, date_from, date_to, section_id=None):
+    """Сводка по дням и неделям (неделя с понедельника) по секциям — только из rollup-таблицы"""
+    rollup = TrainingDailyRollup
+    # Только колонки, без ORM-объектов: за год это сотни строк
+    query = db.session.query(
+        rollup.day, rollup.section_id, Section.name,
+        rollup.sessions, rollup.total_duration, rollup.intensity_sum, rollup.total_load
+    ).join(Section, Section.id == rollup.section_id) \
+        .filter(rollup.user_id == user_id,
+                rollup.day >= date_from,
+                rollup.day <= date_to,
+                rollup.sessions > 0)
+    if section_id:
+        query = query.filter(rollup.section_id == section_id)
+
+    days = []
+    weeks = defaultdict(lambda: [0, 0, 0, 0])
+    names = {}
+    for day, sid, section_name, *totals in query.order_by(rollup.day, rollup.section_id):
+        names[sid] = section_name
+        days.append({"date": day.isoformat(), "section_id": sid, "section": section_name, **_totals(*totals)})
+        week = weeks[(day - timedelta(days=day.weekday()), sid)]
+        for i, value in enumerate(totals):
+            week[i] += value
+
+    return {
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "days": days,
+        "weeks": [
+            {"week_start": week_start.isoformat(), "section_id": sid, "section": names[sid], **_totals(*totals)}
+            for (week_start, sid), totals in sorted(weeks.items())
+        ]
+    }
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import namedtuple
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from app.extensions import db
+from app.models import User
+
+# То, что нужно для проверки прав: без sections, email и прочих полей
+Identity = namedtuple("Identity", "id username role role_version")
+
+
+class UserCache:
+    """
+    Кэш id -> (роль, версия роли) в памяти воркера с коротким TTL.
+    admin_required и claims токена берут роль отсюда, а не SELECT на каждый запрос.
+    Смена роли в этом воркере сбрасывает запись сразу, в других — через ttl секунд
+    (или раньше, если придет токен с более новой версией роли).
+    """
+
+    def __init__(self, ttl=10, max_size=10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}  # user_id -> (Identity, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, user_id, min_version=None):
+        user_id = int(user_id)
+        entry = self._entries.get(user_id)
+        if entry and entry[1] > time.monotonic() \
+                and (min_version is None or entry[0].role_version >= min_version):
+            return entry[0]
+        row = db.session.query(User.id, User.username, User.role, User.role_version) \
+            .filter(User.id == user_id).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+        return self._put(Identity(row.id, row.username, row.role, row.role_version or 0))
+
+    def put(self, user):
+        """Положить уже загруженного пользователя (логин) — без лишнего запроса"""
+        return self._put(Identity(user.id, user.username, user.role, user.role_version or 0))
+
+    def _put(self, identity):
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries.clear()
+            self._entries[identity.id] = (identity, time.monotonic() + self.ttl)
+        return identity
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(int(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def current_identity():
+    """Пользователь текущего запроса: один раз на запрос (g), дальше кэш воркера, при промахе — один SELECT"""
+    claims = get_jwt()
+    # Привязка к расшифрованному токену этого запроса: g переживает запрос,
+    # если контекст приложения держат снаружи (тесты, CLI)
+    if g.get("identity_claims") is not claims:
+        # Токен выдан после смены роли, а кэш этого воркера ее еще не видел — перечитываем.
+        # Более старый rv ничего не меняет: роль все равно берется из кэша/БД, не из токена
+        g.identity = user_cache.get(get_jwt_identity(), min_version=claims.get("rv"))
+        g.identity_claims = claims
+    return g.identity
+
+
+def add_role_claims(identity):
+    """additional_claims_loader: роль и ее версия в токене (видны фронтенду без /users/profile)"""
+    user = user_cache.get(identity)
+    if user is None:
+        return {}
+    return {"role": user.role, "rv": user.role_version}
@@ -1,19 +1,99 @@
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from flask import current_app
+from app.services.circuit_breaker import get_breaker
+
 
 class WeatherService:
-    def __init__(self):
-        self.base_url = "https://api.openweathermap.org/data/2.5/weather"
+    """
+    Погода с OpenWeatherMap с кэшем по городу:
+    - свежие данные (моложе ttl) отдаются из памяти;
+    - устаревшие (моложе stale_ttl) отдаются сразу, а обновление идет в фоне;
+    - одновременные промахи по одному городу делают ОДИН запрос наверх.
+    """
+
+    def __init__(self, base_url="https://api.openweathermap.org/data/2.5/weather",
+                 ttl=600, stale_ttl=3600, negative_ttl=60, timeout=5, breaker=None):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+
+        # Пул keep-alive соединений вместо нового TCP/TLS на каждый запрос.
+        # trust_env=False — игнорируем системные настройки прокси
+        self.session = requests.Session()
+        self.session.trust_env = False
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._cache = {}     # city -> (data, fetched_at)
+        self._inflight = {}  # city -> threading.Event текущего запроса
+        self._negative = {}  # city -> когда upstream ответил 4xx (неизвестный город и т.п.)
+        self.breaker = breaker or get_breaker("openweather")
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "negative_hits": 0, "upstream_calls": 0}
 
     def get_weather(self, city="Moscow"):
         api_key = current_app.config.get("WEATHER_API_KEY")
-        
-        # Специальный пустой словарь прокси, чтобы игнорировать системные настройки
-        no_proxies = {
-            "http": None,
-            "https": None,
-        }
-        
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._cache.get(city)
+            age = now - entry[1] if entry else None
+
+            if entry and age < self.ttl:
+                self.stats["hits"] += 1
+                return entry[0]
+
+            if entry and age < self.stale_ttl:
+                # stale-while-revalidate: отвечаем сразу, обновляем в фоне
+                self.stats["stale"] += 1
+                if city not in self._inflight:
+                    self._inflight[city] = threading.Event()
+                    threading.Thread(target=self._refresh, args=(city, api_key), daemon=True).start()
+                return entry[0]
+
+            # Негативный кэш: недавно получили 4xx по этому городу — не спрашиваем снова
+            failed_at = self._negative.get(city)
+            if failed_at and now - failed_at < self.negative_ttl:
+                self.stats["negative_hits"] += 1
+                return None
+
+            self.stats["misses"] += 1
+            waiter = self._inflight.get(city)
+            if waiter is None:
+                self._inflight[city] = threading.Event()
+
+        if waiter is not None:
+            # Кто-то уже пошел за этим городом — ждем его результат
+            waiter.wait(self.timeout + 1)
+            with self._lock:
+                entry = self._cache.get(city)
+            return entry[0] if entry else None
+
+        return self._refresh(city, api_key)
+
+    def _refresh(self, city, api_key):
+        data = None
+        try:
+            data = self._fetch(city, api_key)
+        finally:
+            with self._lock:
+                if data:
+                    self._cache[city] = (data, time.monotonic())
+                self._inflight.pop(city).set()
+        return data
+
+    def _fetch(self, city, api_key):
+        # Предохранитель разомкнут — сразу отдаем None (роут ответит 503), без ожидания таймаута
+        if not self.breaker.allow():
+            return None
+
+        self.stats["upstream_calls"] += 1
         try:
             params = {
                 "q": city,
@@ -21,15 +101,10 @@ class WeatherService:
                 "units": "metric",
                 "lang": "ru"
             }
-            # Добавляем proxies=no_proxies в запрос
-            response = requests.get(
-                self.base_url, 
-                params=params, 
-                timeout=5, 
-                proxies=no_proxies # <-- Игнорируем прокси
-            )
-            
+            response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+
             if response.status_code == 200:
+                self.breaker.record_success()
                 data = response.json()
                 return {
                     "temp": round(data["main"]["temp"]),
@@ -38,8 +113,16 @@ class WeatherService:
                     "city": data["name"]
                 }
             print(f"Weather API error code: {response.status_code}")
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                # Ошибка запроса, а не сервиса: сервис жив, запоминаем город как "плохой"
+                self.breaker.record_success()
+                with self._lock:
+                    self._negative[city] = time.monotonic()
             return None
         except Exception as e:
             # Тот самый текст ошибки, который ты скинул, попадет сюда
             print(f"Weather Connection error: {e}")
-            return None
\ No newline at end of file
+            self.breaker.record_failure()
+            return None
@@ -1,16 +1,15 @@
 # app/utils.py
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import get_jwt_identity
-from app.models import User
 from app.extensions import db
+from app.services.user_cache import current_identity
 
 def admin_required():
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            user_id = get_jwt_identity()
-            user = db.session.get(User, int(user_id))
+            # Роль из кэша воркера (app/services/user_cache.py), а не SELECT на каждый запрос
+            user = current_identity()
             
             if not user:
                 return jsonify({"error": "Пользователь не найден"}), 404
@@ -20,4 +19,42 @@ def admin_required():
                 
             return fn(*args, **kwargs)
         return decorator
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def ensure_columns():
+    """
+    create_all не добавляет новые колонки в уже существующие таблицы (миграций у нас нет) —
+    докидываем nullable-колонки через ALTER TABLE ADD COLUMN
+    """
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=db.engine.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}')
+
+# Индексы, замененные другими: в старых базах их надо удалить (лишняя запись на каждый INSERT)
+OBSOLETE_INDEXES = {
+    "token_blocklist": ["ix_token_blocklist_jti"],  # заменен на ix_token_blocklist_jti_revoked
+}
+
+def ensure_indexes():
+    """create_all не добавляет новые индексы в уже существующие таблицы — докидываем их сами"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table_name, names in OBSOLETE_INDEXES.items():
+            if not inspector.has_table(table_name):
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table_name)}
+            for name in names:
+                if name in existing:
+                    conn.exec_driver_sql(f'DROP INDEX "{name}"')
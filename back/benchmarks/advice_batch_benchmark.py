@@ -0,0 +1,78 @@
+"""
+Бенчмарк совета дня: пошаговый путь (training_load.get_state + generate_decision_and_prompt
+на каждого пользователя) против пакетного NumPy-движка (одна оконная выборка).
+Данные генерируются во временной SQLite-базе.
+
+Запуск: python -m benchmarks.advice_batch_benchmark [пользователей] [выборка_для_пошагового]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from app import create_app
+from app.extensions import db
+from app.models import User, Section, Training, DailyAdvice
+
+
+def seed(users, per_user=3):
+    db.session.add(Section(id=1, name="Зал"))
+    db.session.execute(insert(User), [
+        {"id": i, "username": f"u{i}", "email": f"u{i}@bench", "password_hash": "x", "role": "user"}
+        for i in range(1, users + 1)
+    ])
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": i, "section_id": 1, "duration": 45, "intensity": random.randint(1, 10),
+         "date": now - timedelta(days=random.randint(0, 10), hours=random.randint(0, 23))}
+        for i in range(1, users + 1) for _ in range(per_user)
+    ]
+    for start in range(0, len(rows), 50_000):
+        db.session.execute(insert(Training), rows[start:start + 50_000])
+    db.session.commit()
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    sample = min(users, int(sys.argv[2]) if len(sys.argv) > 2 else 5_000)
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    try:
+        with app.app_context():
+            from app.routes.ai import generate_decision_and_prompt
+            from app.services import training_load
+            from app.services.batch_advice import run_batch
+
+            seed(users)
+            training_load.build_missing()  # состояния нагрузки для bulk-вставленных тренировок
+
+            started = time.perf_counter()
+            for user_id in range(1, sample + 1):
+                generate_decision_and_prompt(training_load.get_state(user_id))
+            per_user = (time.perf_counter() - started) / sample
+            db.session.rollback()
+
+            # Текст ИИ считаем уже набранным в кэше — замеряем сам пакетный расчет
+            from app.services.batch_advice import llm_cache
+            llm_cache.get = lambda key: "Совет из кэша"
+
+            started = time.perf_counter()
+            created, _ = run_batch()
+            batch = time.perf_counter() - started
+            assert created == users == DailyAdvice.query.count()
+
+        print(f"{users} пользователей:")
+        print(f"  пошагово: {per_user * 1000:.2f} ms/пользователь -> ~{per_user * users:.1f} s "
+              f"(замер на {sample}, без записи в БД)")
+        print(f"  пакетно:  {batch:.2f} s, включая bulk insert в daily_advice")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
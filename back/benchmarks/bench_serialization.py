@@ -0,0 +1,148 @@
+"""
+Бенчмарк сериализации списков (pytest-benchmark): строк в секунду на эндпоинт
+со стандартным JSON-провайдером Flask и с orjson (app/json_provider.py), плюс
+отдельно конвейер «ORM + to_dict() + json» против «колонки (Row) + orjson».
+Данные генерируются во временной SQLite-базе.
+
+Запуск: python -m pytest benchmarks/bench_serialization.py
+        (--benchmark-json=out.json — сохранить результаты, rows_per_sec в extra_info)
+"""
+import json
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+
+from app import create_app
+from app.extensions import db
+from app.json_provider import OrjsonProvider
+from app.models import User, Section, Training, user_sections
+from app.routes.training import build_trainings_query
+from app.services.response_cache import response_cache
+
+USERS = 1000
+SECTIONS = 30
+TRAININGS = 5000
+PAGE = 500
+
+PROVIDERS = {"stdlib": DefaultJSONProvider, "orjson": OrjsonProvider}
+
+_results = []
+
+
+def seed():
+    db.session.execute(insert(Section), [
+        {"id": i, "name": f"Секция {i}", "description": "Групповые и индивидуальные занятия " * 3}
+        for i in range(1, SECTIONS + 1)
+    ])
+    db.session.execute(insert(User), [
+        {"id": i, "username": f"user{i}", "email": f"user{i}@bench", "password_hash": "x",
+         "role": "admin" if i == 1 else "user", "created_at": datetime(2025, 1, 1) + timedelta(minutes=i)}
+        for i in range(1, USERS + 1)
+    ])
+    db.session.execute(insert(user_sections), [
+        {"user_id": u, "section_id": s}
+        for u in range(1, USERS + 1) for s in random.sample(range(1, SECTIONS + 1), random.randint(1, 3))
+    ])
+    start = datetime(2024, 1, 1)
+    db.session.execute(insert(Training), [
+        {"user_id": 2, "section_id": random.randint(1, SECTIONS), "duration": random.randint(20, 90),
+         "intensity": random.randint(1, 10), "date": start + timedelta(hours=i * 3),
+         "note": "Интервалы на дорожке, заминка, растяжка"}
+        for i in range(TRAININGS)
+    ])
+    db.session.commit()
+
+
+@pytest.fixture(scope="module")
+def bench_app(request):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "JWT_SECRET_KEY": "bench-secret-key-32-bytes-long!!"})
+    with app.app_context():
+        seed()
+        app.tokens = {
+            "admin": {"Authorization": f"Bearer {create_access_token(identity='1')}"},
+            "user": {"Authorization": f"Bearer {create_access_token(identity='2')}"},
+        }
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    if _results:
+        # Итог после прогона модуля (вывод фикстур pytest иначе перехватывает)
+        with request.config.pluginmanager.get_plugin("capturemanager").global_and_fixture_disabled():
+            print("\nстрок/с (по среднему времени):")
+            for name, rows_per_sec in _results:
+                print(f"  {name:<50} {rows_per_sec:>12,.0f}")
+
+
+@pytest.fixture(params=list(PROVIDERS))
+def client(bench_app, request):
+    bench_app.json = PROVIDERS[request.param](bench_app)
+    yield bench_app.test_client()
+    bench_app.json = OrjsonProvider(bench_app)
+
+
+def report(benchmark, rows):
+    if benchmark.stats is None:  # --benchmark-disable: прогон без замеров
+        return
+    rows_per_sec = rows / benchmark.stats.stats.mean
+    benchmark.extra_info.update(rows=rows, rows_per_sec=round(rows_per_sec))
+    _results.append((benchmark.name, rows_per_sec))
+
+
+def test_users_list(benchmark, bench_app, client):
+    res = benchmark(client.get, '/users/', headers=bench_app.tokens["admin"])
+    assert res.status_code == 200
+    report(benchmark, len(res.json["users"]))
+
+
+def test_sections_list(benchmark, client):
+    # Каждый раунд — заново запрос и сериализация (как при смене версии кэша)
+    res = benchmark.pedantic(client.get, args=('/sections/',), setup=response_cache.clear, rounds=200)
+    assert res.status_code == 200
+    report(benchmark, len(res.json["sections"]))
+
+
+def test_sections_list_cached(benchmark, bench_app):
+    client = bench_app.test_client()
+    res = benchmark(client.get, '/sections/')
+    report(benchmark, len(res.json["sections"]))
+
+
+def test_trainings_page(benchmark, bench_app, client):
+    res = benchmark(client.get, f'/training/?per_page={PAGE}', headers=bench_app.tokens["user"])
+    assert res.status_code == 200
+    report(benchmark, len(res.json["trainings"]))
+
+
+# Только сериализация страницы тренировок, без HTTP: как было и как стало
+def orm_to_dict_stdlib():
+    items = Training.query.filter_by(user_id=2) \
+        .options(joinedload(Training.user), joinedload(Training.section)) \
+        .order_by(Training.date.desc()).limit(PAGE).all()
+    return json.dumps([t.to_dict() for t in items]).encode()
+
+
+def rows_orjson():
+    rows = build_trainings_query(2).limit(PAGE).all()
+    return orjson.dumps([row._asdict() for row in rows])
+
+
+@pytest.mark.parametrize("pipeline", [orm_to_dict_stdlib, rows_orjson], ids=lambda f: f.__name__)
+def test_trainings_serialization(benchmark, bench_app, pipeline):
+    with bench_app.app_context():
+        body = benchmark(pipeline)
+    assert len(orjson.loads(body)) == PAGE
+    report(benchmark, PAGE)
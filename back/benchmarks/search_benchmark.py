@@ -0,0 +1,88 @@
+"""
+Бенчмарк поиска по заметкам: ILIKE '%слово%' против FTS5 (training_fts).
+Данные генерируются во временной SQLite-базе: слова заметок берутся по закону Ципфа
+(тренировочная лексика + длинный хвост редких слов), заметки распределены по пользователям.
+
+Запуск: python -m benchmarks.search_benchmark [заметок] [пользователей] [повторов]
+"""
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from app import create_app
+from app.extensions import db
+from app.models import User, Section, Training
+from app.routes.training import build_trainings_query
+
+WORDS = ("тренировка тренировки бег беговая интервалы интервальная зал жим тяга присед становая "
+         "растяжка заминка разминка пульс темп километры восстановление кардио плавание бассейн "
+         "велосипед подъемы спина ноги плечи пресс кроссфит йога сон усталость легко тяжело").split()
+QUERIES = ["тренировки", "интервальная тренировка", "бассейн", "становая тяга", "йог"]
+# Длинный хвост: в живых заметках словарь большой, и большинство слов редкие
+VOCABULARY = WORDS + [f"слово{i}" for i in range(20_000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+
+def seed(notes, users):
+    db.session.add(Section(id=1, name="Зал"))
+    db.session.execute(insert(User), [
+        {"id": i, "username": f"u{i}", "email": f"u{i}@bench", "password_hash": "x", "role": "user"}
+        for i in range(1, users + 1)
+    ])
+    start = datetime(2024, 1, 1)
+    for offset in range(0, notes, 50_000):
+        db.session.execute(insert(Training), [
+            {"user_id": random.randint(1, users), "section_id": 1, "duration": 45, "intensity": 5,
+             "date": start + timedelta(minutes=offset + i),
+             "note": " ".join(random.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=random.randint(3, 12)))}
+            for i in range(min(50_000, notes - offset))
+        ])
+    db.session.commit()
+
+
+def measure(search, user_id, fts, repeats, sort="date_desc"):
+    from app.services import note_search
+    enabled = note_search.fts_enabled
+    if not fts:
+        note_search.fts_enabled = lambda: False  # тот же запрос, но через ILIKE
+    try:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            query = build_trainings_query(user_id, search, sort=sort)
+            query.paginate(page=1, per_page=20, error_out=False)
+        return (time.perf_counter() - started) / repeats * 1000
+    finally:
+        note_search.fts_enabled = enabled
+
+
+def main():
+    notes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            seed(notes, users)  # триггеры FTS уже стоят — индекс строится по ходу вставки
+            print(f"{notes} заметок, {users} пользователей: вставка с индексацией {time.perf_counter() - started:.1f} s")
+            print("Страница 20 + total, поиск в заметках пользователя:")
+
+            for search in QUERIES:
+                ilike = measure(search, 1, False, repeats)
+                fts = measure(search, 1, True, repeats)
+                ranked = measure(search, 1, True, repeats, sort="relevance")
+                print(f"  «{search}»: ILIKE {ilike:8.2f} ms | FTS5 {fts:8.2f} ms | FTS5 + bm25 {ranked:8.2f} ms")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Нагрузочный тест SQLite: несколько процессов (как воркеры gunicorn) одновременно
+читают и пишут через API — список тренировок, добавление тренировки, пакет записей
+дневника, logout (запись в token_blocklist). Считаются пропускная способность
+и доля ошибок "database is locked" без настроек и с PRAGMA из app/database.py.
+
+Запуск: python -m benchmarks.sqlite_load_test [процессов] [секунд на режим]
+"""
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+from collections import Counter
+
+MODES = {
+    # Как было: rollback journal, стандартный пул, busy handler драйвера по умолчанию (5 с)
+    "по умолчанию": {"SQLITE_PRAGMAS": {}, "SQLALCHEMY_ENGINE_OPTIONS": {}},
+    "WAL + PRAGMA": {},
+}
+
+
+def make_app(path, overrides):
+    from app import create_app
+    return create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "PROPAGATE_EXCEPTIONS": True, **overrides})
+
+
+def seed(path, overrides, workers):
+    from app.extensions import db
+    from app.models import User, Section
+    app = make_app(path, overrides)
+    with app.app_context():
+        db.session.add(Section(id=1, name="Зал"))
+        for i in range(1, workers + 1):
+            db.session.add(User(id=i, username=f"w{i}", email=f"w{i}@load", password_hash="x"))
+        db.session.commit()
+        mode = db.session.execute(db.text("PRAGMA journal_mode")).scalar()
+        db.engine.dispose()
+    return mode
+
+
+def worker(path, overrides, user_id, duration, barrier, results):
+    from flask_jwt_extended import create_access_token
+    warnings.simplefilter("ignore")  # короткий тестовый JWT-ключ
+    app = make_app(path, overrides)
+    client = app.test_client()
+    with app.app_context():
+        token = create_access_token(identity=str(user_id))
+    headers = {"Authorization": f"Bearer {token}"}
+    counts, latencies = Counter(), []
+
+    barrier.wait()  # отсчет начинается, когда все процессы подняли приложение
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        op = random.random()
+        started = time.perf_counter()
+        try:
+            if op < 0.5:
+                res = client.get('/training/?per_page=20', headers=headers)
+            elif op < 0.75:
+                res = client.post('/training/', data={"section_id": 1, "duration": 45, "intensity": random.randint(1, 10),
+                                                      "note": "нагрузочный тест"}, headers=headers)
+            elif op < 0.9:
+                res = client.post('/diary/', json={"entries": [{"date": "2026-03-02", "note": "запись"}] * 7},
+                                  headers=headers)
+            else:
+                with app.app_context():
+                    fresh = create_access_token(identity=str(user_id))
+                res = client.post('/users/logout', headers={"Authorization": f"Bearer {fresh}"})
+            counts["ok" if res.status_code < 400 else f"http_{res.status_code}"] += 1
+        except Exception as e:
+            counts["locked" if "database is locked" in str(e) else type(e).__name__] += 1
+        latencies.append(time.perf_counter() - started)
+    results.put((counts, latencies))
+
+
+def run_mode(name, overrides, workers, duration):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        journal = seed(path, overrides, workers)
+        ctx = mp.get_context("spawn")
+        barrier, queue = ctx.Barrier(workers), ctx.Queue()
+        procs = [ctx.Process(target=worker, args=(path, overrides, i, duration, barrier, queue))
+                 for i in range(1, workers + 1)]
+        for proc in procs:
+            proc.start()
+        results = [queue.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    counts = sum((c for c, _ in results), Counter())
+    latencies = sorted(l for _, ls in results for l in ls)
+    total = sum(counts.values())
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    print(f"{name} (journal_mode={journal}):")
+    print(f"  операций: {total}, успешно {counts['ok'] / duration:.0f}/с, "
+          f"database is locked: {counts['locked']} ({counts['locked'] / max(total, 1):.1%}), p95 {p95:.0f} ms")
+    other = {k: v for k, v in counts.items() if k not in ("ok", "locked")}
+    if other:
+        print(f"  прочие ошибки: {other}")
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"{workers} процессов, {duration:.0f} с на режим")
+    for name, overrides in MODES.items():
+        run_mode(name, overrides, workers, duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Бенчмарк /training/stats: чтение готовой дневной сводки (training_daily_rollup)
+против агрегации сырых тренировок на лету (GROUP BY по training).
+Данные генерируются во временной SQLite-базе.
+
+Запуск: python -m benchmarks.stats_benchmark [тренировок] [повторов]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert
+from app import create_app
+from app.extensions import db
+from app.models import User, Section, Training
+from app.services import training_stats
+
+
+def seed(sessions):
+    db.session.add_all([Section(id=1, name="Зал"), Section(id=2, name="Бег")])
+    db.session.add(User(id=1, username="u1", email="u1@bench", password_hash="x", role="user"))
+    start = datetime(2020, 1, 1)
+    db.session.execute(insert(Training), [
+        {"user_id": 1, "section_id": random.randint(1, 2), "duration": random.randint(20, 90),
+         "intensity": random.randint(1, 10), "date": start + timedelta(hours=random.randint(0, 5 * 365 * 24))}
+        for _ in range(sessions)
+    ])
+    db.session.commit()
+
+
+def on_the_fly(user_id, date_from, date_to):
+    day = func.date(Training.date)
+    return db.session.query(
+        day, Training.section_id, Section.name,
+        func.count(Training.id), func.sum(Training.duration),
+        func.sum(Training.intensity), func.sum(Training.duration * Training.intensity)
+    ).join(Section, Section.id == Training.section_id) \
+        .filter(Training.user_id == user_id,
+                Training.date >= date_from,
+                Training.date < date_to + timedelta(days=1)) \
+        .group_by(day, Training.section_id).all()
+
+
+def measure(fn, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1000
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    try:
+        with app.app_context():
+            seed(sessions)
+            rows = training_stats.rebuild()
+
+            print(f"{sessions} тренировок одного пользователя, {rows} строк в сводке:")
+            for label, days in [("28 дней", 28), ("год", 365), ("все время", 5 * 365)]:
+                date_to = date(2024, 12, 31)
+                date_from = date_to - timedelta(days=days - 1)
+                raw = measure(lambda: on_the_fly(1, date_from, date_to), repeats)
+                rollup = measure(lambda: training_stats.get_stats(1, date_from, date_to), repeats)
+                print(f"  {label:>9}: на лету {raw:7.2f} ms | из сводки {rollup:7.2f} ms (с недельной группировкой)")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Бенчмарк превью: сколько байт картинок скачивает страница /training/
+с оригиналами (file_url) и с превью (thumb_url). S3 подменяется moto.
+
+Запуск: python -m benchmarks.thumbnail_benchmark [тренировок_на_странице]
+"""
+import io
+import os
+import sys
+import time
+
+os.environ.setdefault("MOTO_S3_CUSTOM_ENDPOINTS", "http://minio:9000")
+
+from moto import mock_aws
+from PIL import Image
+from app.services.s3_service import S3Service
+from app.services.thumbnail_service import ThumbnailService, thumb_key
+
+
+def fake_photo():
+    # Шум жмется плохо — размер файла близок к настоящему фото с телефона
+    img = Image.frombytes("RGB", (3000, 2000), os.urandom(3000 * 2000 * 3))
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+
+def main():
+    per_page = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with mock_aws():
+        s3 = S3Service()
+        s3.s3_internal.create_bucket(Bucket=s3.bucket)
+        thumbs = ThumbnailService(s3, workers=4)
+
+        keys = [f"user_1/bench-{i}.jpg" for i in range(per_page)]
+        for key in keys:
+            s3.s3_internal.put_object(Bucket=s3.bucket, Key=key, Body=fake_photo())
+
+        started = time.perf_counter()
+        for future in [thumbs.submit(k) for k in keys]:
+            future.result()
+        elapsed = time.perf_counter() - started
+
+        def size(key):
+            return s3.s3_internal.head_object(Bucket=s3.bucket, Key=key)["ContentLength"]
+
+        originals = sum(size(k) for k in keys)
+        previews = sum(size(thumb_key(k)) for k in keys)
+
+    print(f"страница из {per_page} тренировок с фото:")
+    print(f"  оригиналы: {originals / 1024:.0f} KB")
+    print(f"  превью:    {previews / 1024:.0f} KB ({originals / previews:.0f}x меньше)")
+    print(f"  генерация превью: {elapsed * 1000 / per_page:.0f} ms на фото")
+
+
+if __name__ == "__main__":
+    main()
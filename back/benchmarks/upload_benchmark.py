@@ -0,0 +1,65 @@
+"""
+Бенчмарк загрузки вложений: старый путь (multipart/form-data -> FileStorage ->
+upload_file) против потокового (POST /training/upload -> upload_stream).
+S3 подменяется moto, поэтому MinIO не нужен (moto сам держит объекты в памяти,
+так что смотреть стоит на разницу между путями, а не на абсолютный пик).
+
+Запуск: python -m benchmarks.upload_benchmark [размер_МБ] [повторы]
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("MOTO_S3_CUSTOM_ENDPOINTS", "http://minio:9000")
+
+from moto import mock_aws
+from werkzeug.formparser import parse_form_data
+from werkzeug.test import EnvironBuilder
+from app.services.s3_service import S3Service
+
+
+def legacy_upload(s3, payload):
+    # Как в add_training: Werkzeug разбирает форму целиком, потом upload_file
+    env = EnvironBuilder(method="POST", data={
+        "file": (io.BytesIO(payload), "photo.jpg", "image/jpeg")
+    }).get_environ()
+    _, _, files = parse_form_data(env)
+    file = files["file"]
+    s3.upload_file(file, "bench/legacy.jpg", file.content_type)
+
+
+def streaming_upload(s3, payload):
+    s3.upload_stream(io.BytesIO(payload), "bench/stream.jpg", "image/jpeg", max_size=len(payload))
+
+
+def measure(fn, s3, payload, repeats):
+    timings, peaks = [], []
+    for _ in range(repeats):
+        tracemalloc.start()
+        started = time.perf_counter()
+        fn(s3, payload)
+        timings.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    timings.sort()
+    return timings[len(timings) // 2], max(peaks)
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    payload = os.urandom(int(size_mb * 1024 * 1024))
+
+    with mock_aws():
+        s3 = S3Service()
+        s3.s3_internal.create_bucket(Bucket=s3.bucket)
+        for name, fn in (("legacy", legacy_upload), ("streaming", streaming_upload)):
+            latency, peak = measure(fn, s3, payload, repeats)
+            print(f"{name:10s} {size_mb:.0f}MB: p50 {latency * 1000:.1f} ms, "
+                  f"peak python heap {peak / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
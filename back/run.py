@@ -1,6 +1,9 @@
 from app import create_app
 from app.extensions import db, jwt
-from app.models import User, TokenBlocklist
+from app.models import User
+from app.services.revocation_cache import revocation_cache
+from app.services.token_cleanup import start_purge_timer
+from app.routes.training import deletion_queue
 from datetime import timedelta
 from flask import jsonify
 
@@ -14,8 +17,14 @@ app = create_app()
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(minutes=15)
 app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=30)
 
-# Ключ для стороннего API (Пункт 5.3)
-app.config["WEATHER_API_KEY"] = "d2ba7fa31d914df5412cc57dd71323c3"
+# Ключ для стороннего API (Пункт 5.3) — из переменной WEATHER_API_KEY (app/config.py)
+
+# Фоновая чистка истекших токенов из token_blocklist (по умолчанию раз в час, см. app/config.py)
+if app.config["TOKEN_PURGE_INTERVAL"]:
+    start_purge_timer(app, interval=app.config["TOKEN_PURGE_INTERVAL"])
+
+# Фоновое удаление файлов из MinIO (очередь s3_deletion_outbox)
+deletion_queue.start(app)
 
 # Регистрация роутов для SEO и Погоды
 app.register_blueprint(external_bp, url_prefix='/external')
@@ -32,9 +41,8 @@ def forbidden(e):
 # --- ПРОВЕРКА ТОКЕНОВ (Лабораторная №2) ---
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
-    jti = jwt_payload["jti"]
-    token = TokenBlocklist.query.filter_by(jti=jti, revoked=True).first()
-    return token is not None
+    # Проверка идет по кэшу в памяти, SELECT в token_blocklist не нужен
+    return revocation_cache.is_revoked(jwt_payload["jti"])
 
 # --- АВТО-СОЗДАНИЕ АДМИНА ---
 with app.app_context():
@@ -1,13 +1,14 @@
 import pytest
+from sqlalchemy import event
 from app import create_app
 from app.extensions import db
-from app.models import User
+from app.models import User, Section
 
 @pytest.fixture
 def app():
-    # Создаем приложение с тестовым конфигом
-    app = create_app()
-    app.config.update({
+    # Создаем приложение с тестовым конфигом (до инициализации расширений,
+    # иначе движок уже смотрит в instance/sportcenter.db)
+    app = create_app({
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", # База данных в памяти (очищается сама)
         "JWT_SECRET_KEY": "test-secret-key",
@@ -39,4 +40,31 @@ def admin_token(client, app):
             "username": "testadmin",
             "password": "password"
         })
-        return res.json['access_token']
\ No newline at end of file
+        return res.json['access_token']
+@pytest.fixture
+def user_token(client, app):
+    # Обычный пользователь + одна секция для тренировок
+    with app.app_context():
+        user = User(username="athlete", email="athlete@user.com")
+        user.set_password("password")
+        db.session.add(user)
+        db.session.add(Section(name="Бег", description="Легкая атлетика"))
+        db.session.commit()
+
+        res = client.post('/users/login', json={
+            "username": "athlete",
+            "password": "password"
+        })
+        return res.json['access_token']
+
+@pytest.fixture
+def query_counter(app):
+    # Считает SQL-запросы к БД (для проверки бюджета запросов на эндпоинт)
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", on_execute)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", on_execute)
@@ -0,0 +1,280 @@
+import json
+import pytest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import time
+from datetime import date, datetime, timedelta
+from app.extensions import db
+from app.models import Training, User, Section, DailyAdvice
+from app.services import advice_service
+
+
+def add_training(username, intensity, days_ago):
+    user = User.query.filter_by(username=username).first()
+    db.session.add(Training(user_id=user.id, section_id=Section.query.first().id, duration=45,
+                            intensity=intensity, date=datetime.utcnow() - timedelta(days=days_ago)))
+    db.session.commit()
+    return user
+
+
+# 1. Промах кэша не ждет ИИ: цифры сразу, текст дописывается в фоне
+def test_recommend_returns_decision_without_waiting(client, user_token, monkeypatch):
+    monkeypatch.setattr(advice_service, "generate_message", lambda prompt: "Сегодня отдых!")
+    user = add_training("athlete", 9, 0)
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    res = client.get('/ai/recommend', headers=headers)
+    assert res.json["message_pending"] is True
+    assert res.json["status"] == "rest"
+    assert res.json["suggested_intensity"] == 2
+
+    deadline = time.time() + 5
+    while advice_service.advice_queue.is_pending(user.id, date.today()) and time.time() < deadline:
+        time.sleep(0.01)
+
+    res = client.get('/ai/recommend', headers=headers)
+    assert res.json["from_cache"] is True
+    assert res.json["message"] == "Сегодня отдых!"
+
+
+# 1а. Ollama недоступна: вместо вечного «Тренер формулирует совет...» — цифры с запасным текстом
+def test_recommend_fallback_when_ollama_fails(client, user_token, monkeypatch):
+    from app.services.circuit_breaker import OPEN
+
+    def ollama_down(prompt):
+        raise ConnectionError("ollama down")
+
+    monkeypatch.setattr(advice_service, "generate_message", ollama_down)
+    monkeypatch.setattr(advice_service.advice_queue, "_failed", {})
+    user = add_training("athlete", 9, 0)
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    assert client.get('/ai/recommend', headers=headers).json["message_pending"] is True
+    deadline = time.time() + 5
+    while advice_service.advice_queue.is_pending(user.id, date.today()) and time.time() < deadline:
+        time.sleep(0.01)
+
+    res = client.get('/ai/recommend', headers=headers)
+    assert "message_pending" not in res.json
+    assert (res.json["message"], res.json["status"]) == (advice_service.FALLBACK_MESSAGE, "rest")
+    assert DailyAdvice.query.count() == 0  # после восстановления Ollama совет сгенерируется
+
+    # Цепь разомкнута — в очередь даже не ставим
+    advice_service.advice_queue._failed.clear()
+    monkeypatch.setattr(advice_service.ollama_breaker, "state", OPEN)
+    monkeypatch.setattr(advice_service.ollama_breaker, "_opened_at", time.monotonic())
+    res = client.get('/ai/recommend', headers=headers)
+    assert res.json["message"] == advice_service.FALLBACK_MESSAGE
+    assert not advice_service.advice_queue.is_pending(user.id, date.today())
+
+
+# 2. Ночной пересчет заполняет кэш советов для активных пользователей
+def test_precompute_cli(app, user_token, monkeypatch):
+    monkeypatch.setattr("app.routes.ai.generate_message", lambda prompt: "Вперед!")
+    user = add_training("athlete", 3, 1)
+
+    result = app.test_cli_runner().invoke(args=["ai", "precompute"])
+    assert "создано 1" in result.output
+
+    advice = DailyAdvice.query.filter_by(user_id=user.id, date=date.today()).one()
+    assert (advice.status, advice.suggested_intensity, advice.message) == ("progress", 9, "Вперед!")
+
+
+# 3. SSE: решение приходит сразу, токены — по мере генерации фейковой Ollama
+def test_recommend_stream(client, user_token, monkeypatch):
+    delay = 0.5
+    state = {"prompt": None}
+
+    class FakeOllama(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            state["prompt"] = body["prompt"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            time.sleep(delay)  # «думает» до первого токена
+            for token in ["Сегодня ", "только ", "прогулка."]:
+                self.wfile.write((json.dumps({"response": token, "done": False}) + "\n").encode())
+                self.wfile.flush()
+            self.wfile.write(b'{"response": "", "done": true}\n')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(advice_service, "OLLAMA_URL", f"http://127.0.0.1:{server.server_port}/api/generate")
+
+    user = add_training("athlete", 9, 0)
+    started = time.perf_counter()
+    res = client.get('/ai/recommend/stream', headers={"Authorization": f"Bearer {user_token}"})
+    chunks = res.iter_encoded()
+    first = next(chunks).decode()
+    ttfb = time.perf_counter() - started
+    body = first + b"".join(chunks).decode()
+    server.shutdown()
+
+    assert res.mimetype == "text/event-stream"
+    assert first.startswith("event: decision") and '"status": "rest"' in first
+    assert ttfb < delay
+    assert body.count("event: token") == 3
+    assert '"message": "Сегодня только прогулка."' in body
+    assert '"message"' not in state["prompt"]
+
+    advice = DailyAdvice.query.filter_by(user_id=user.id, date=date.today()).one()
+    assert advice.message == "Сегодня только прогулка."
+
+
+# 4. Пакетный NumPy-движок принимает те же решения, что и пошаговый путь
+def test_batch_engine_matches_per_user_rules(app, monkeypatch):
+    from app.routes.ai import generate_decision_and_prompt
+    from app.services import training_load
+    from app.services.batch_advice import run_batch
+
+    section = Section(name="Зал")
+    db.session.add(section)
+    db.session.flush()
+    # (интенсивность, дней назад, длительность); последние два — резкий рост нагрузки:
+    # ACWR ~1.4 (держим уровень) и ~2.0 (отдых)
+    cases = [(9, 0, 45), (9, 3, 45), (3, 1, 45), (3, 5, 45), (6, 2, 45), (10, 7, 45), (4, 2, 45), (8, 1, 45),
+             (6, 2, 210), (6, 1, 300)]
+    for i, (intensity, days_ago, duration) in enumerate(cases):
+        user = User(username=f"batch{i}", email=f"batch{i}@user.com", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        # Старые тренировки через день — хроническая нагрузка; сценарий решает последняя
+        for old in range(42, 7, -2):
+            db.session.add(Training(user_id=user.id, section_id=section.id, intensity=5, duration=45,
+                                    date=datetime.utcnow() - timedelta(days=old)))
+        db.session.add(Training(user_id=user.id, section_id=section.id, intensity=intensity, duration=duration,
+                                date=datetime.utcnow() - timedelta(days=days_ago)))
+    db.session.commit()
+
+    # Текста ИИ в кэше нет — заглушку советом дня не записываем
+    assert run_batch() == (0, len(cases))
+    assert DailyAdvice.query.count() == 0
+
+    monkeypatch.setattr("app.services.batch_advice.llm_cache.get", lambda key: "Совет из кэша")
+    assert run_batch() == (len(cases), 0)
+    assert run_batch() == (0, 0)  # повторный запуск ничего не дублирует
+
+    by_user = {advice.user_id: advice for advice in DailyAdvice.query.all()}
+    for advice in by_user.values():
+        _, decision = generate_decision_and_prompt(training_load.get_state(advice.user_id))
+        assert (advice.status, advice.suggested_intensity) == (decision["status"], decision["intensity"])
+
+    # Правила по ACWR: при той же последней тренировке (6/10, 2 дня назад) рост нагрузки не дает прогрессии
+    caution, danger = (User.query.filter_by(username=f"batch{i}").one().id for i in (8, 9))
+    assert (by_user[caution].status, by_user[caution].suggested_intensity) == ("progress", 6)
+    assert (by_user[danger].status, by_user[danger].suggested_intensity) == ("rest", 2)
+
+
+# 5. Состояние нагрузки обновляется на add/delete и совпадает с пересчетом по истории
+def test_training_load_incremental(client, user_token):
+    from app.models import TrainingLoadState
+    from app.services import training_load
+
+    headers = {"Authorization": f"Bearer {user_token}"}
+    section_id = Section.query.first().id
+    today = date.today()
+    ids = []
+    # Полтора месяца ровных тренировок, потом тяжелая неделя
+    for days_ago in list(range(42, 7, -2)) + [6, 4, 2, 1, 0]:
+        heavy = days_ago < 7
+        res = client.post('/training/', data={
+            "section_id": section_id, "date": (today - timedelta(days=days_ago)).isoformat(),
+            "duration": 120 if heavy else 45, "intensity": 9 if heavy else 5
+        }, headers=headers)
+        assert res.status_code == 201
+        ids.append(res.json["training"]["id"])
+
+    # Удаляем самую раннюю, из середины и последнюю
+    for training_id in (ids[0], ids[3], ids[-1]):
+        assert client.delete(f'/training/{training_id}', headers=headers).status_code == 200
+
+    res = client.get('/ai/load', headers=headers)
+    assert res.status_code == 200
+    assert res.json["zone"] == "danger" and res.json["acwr"] > 1.5
+    assert res.json["days_since"] == 1 and res.json["last_intensity"] == 9
+
+    user_id = User.query.filter_by(username="athlete").first().id
+    state = db.session.get(TrainingLoadState, user_id)
+    assert state.first_day == today - timedelta(days=40)
+    incremental = training_load.snapshot(state)
+    db.session.delete(db.session.get(TrainingLoadState, user_id))
+    db.session.commit()
+    rebuilt = training_load.get_state(user_id)
+    assert rebuilt.first_day == today - timedelta(days=40)
+    assert training_load.snapshot(rebuilt) == incremental
+
+    res = client.get('/ai/recommend', headers=headers)
+    assert (res.json["status"], res.json["suggested_intensity"]) == ("rest", 2)
+
+
+# 6. Клиент SSE отключился посреди потока: пробный вызов полуоткрытой цепи не зависает
+def test_stream_disconnect_releases_probe(monkeypatch):
+    from app.services.circuit_breaker import CircuitBreaker, HALF_OPEN, CLOSED, OPEN
+
+    class FakeStream:
+        def raise_for_status(self):
+            pass
+
+        def iter_lines(self):
+            for token in ["Сегодня ", "отдых."]:
+                yield json.dumps({"response": token, "done": False}).encode()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(advice_service.requests, "post", lambda *a, **kw: FakeStream())
+    breaker = CircuitBreaker("ollama-test", reset_timeout=0)
+    breaker.state = OPEN
+    monkeypatch.setattr(advice_service, "ollama_breaker", breaker)
+
+    tokens = advice_service.stream_message("промпт")
+    assert next(tokens) == "Сегодня "
+    assert breaker.state == HALF_OPEN and breaker.allow() is False  # проба занята
+    tokens.close()  # GeneratorExit, как при обрыве соединения
+    assert breaker.state == CLOSED
+    assert breaker.allow() is True
+
+    # Прерывание до ответа Ollama (SystemExit от gunicorn) — слот просто возвращается
+    breaker.state = OPEN
+
+    def killed(*args, **kwargs):
+        raise SystemExit
+
+    monkeypatch.setattr(advice_service.requests, "post", killed)
+    with pytest.raises(SystemExit):
+        next(advice_service.stream_message("промпт"))
+    assert breaker.state == HALF_OPEN and breaker.allow() is True
+
+
+# 7. 4xx от Ollama (например, модель не скачана) не размыкает цепь, 5xx — размыкает
+def test_ollama_client_errors_do_not_trip_breaker(app, monkeypatch):
+    import requests
+    from app.services.circuit_breaker import CircuitBreaker, CLOSED, OPEN
+
+    def reply(status):
+        response = requests.Response()
+        response.status_code, response.url = status, advice_service.OLLAMA_URL
+        return response
+
+    breaker = CircuitBreaker("ollama-test", min_calls=3, ignored_exceptions=(advice_service.OllamaClientError,))
+    monkeypatch.setattr(advice_service, "ollama_breaker", breaker)
+    monkeypatch.setattr(advice_service.llm_cache, "get", lambda key: None)
+
+    monkeypatch.setattr(advice_service.requests, "post", lambda *a, **kw: reply(404))
+    for _ in range(5):
+        with pytest.raises(advice_service.OllamaClientError):
+            advice_service.generate_message("промпт")
+    assert breaker.state == CLOSED
+
+    monkeypatch.setattr(advice_service.requests, "post", lambda *a, **kw: reply(503))
+    for _ in range(5):
+        with pytest.raises(Exception):
+            advice_service.generate_message("промпт")
+    assert breaker.state == OPEN
@@ -45,4 +45,105 @@ def test_user_cannot_change_roles(client):
     response = client.get('/users/', headers={"Authorization": f"Bearer {token}"})
     
     # Ожидаем 403 Forbidden
-    assert response.status_code == 403
\ No newline at end of file
+    assert response.status_code == 403
+
+
+# 4. Кэш списка секций: ETag / 304, без запросов к БД, сброс при изменении секции
+def test_sections_response_cache(client, admin_token, query_counter):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    res = client.post('/sections/', json={"name": "Бокс"}, headers=headers)
+    assert res.status_code == 201
+    section_id = res.json['id']
+
+    first = client.get('/sections/')
+    assert first.status_code == 200
+    assert "Бокс" in [s["name"] for s in first.json["sections"]]
+    assert "public" in first.headers["Cache-Control"]
+    etag = first.headers["ETag"]
+
+    query_counter.clear()
+    again = client.get('/sections/')
+    assert again.headers["ETag"] == etag and again.data == first.data
+    not_modified = client.get('/sections/', headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.data == b""
+    assert query_counter == []  # оба ответа из памяти
+
+    client.put(f'/sections/{section_id}', json={"name": "Кикбоксинг"}, headers=headers)
+    changed = client.get('/sections/', headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    names = [s["name"] for s in changed.json["sections"]]
+    assert "Кикбоксинг" in names and "Бокс" not in names
+
+
+def test_seo_files_cached(app):
+    from app.routes.external import external_bp
+    app.register_blueprint(external_bp, url_prefix='/external')  # подключается в run.py
+    client = app.test_client()
+    sitemap = client.get('/external/sitemap.xml')
+    assert sitemap.status_code == 200
+    assert "max-age=86400" in sitemap.headers["Cache-Control"]
+    assert client.get('/external/sitemap.xml', headers={"If-None-Match": sitemap.headers["ETag"]}).status_code == 304
+
+
+# 4а. Состояние предохранителей и кэшей — только админу
+def test_dependencies_status_admin_only(app, request):
+    from app.routes.external import external_bp
+    app.register_blueprint(external_bp, url_prefix='/external')  # подключается в run.py
+    # Токены — после регистрации: фикстуры уже делают запросы к приложению
+    admin_token, user_token = request.getfixturevalue("admin_token"), request.getfixturevalue("user_token")
+    client = app.test_client()
+    assert client.get('/external/status').status_code == 401
+    assert client.get('/external/status', headers={"Authorization": f"Bearer {user_token}"}).status_code == 403
+    res = client.get('/external/status', headers={"Authorization": f"Bearer {admin_token}"})
+    assert res.status_code == 200 and "breakers" in res.json
+
+
+# 5. Роль в claims токена; admin_required без запросов к БД; смена роли действует сразу
+def test_admin_role_from_cache(client, app, admin_token, query_counter):
+    from flask_jwt_extended import decode_token
+    with app.app_context():
+        claims = decode_token(admin_token)
+    assert claims["role"] == "admin" and claims["rv"] == 0
+
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    client.get('/users/', headers=admin_headers)
+    query_counter.clear()
+    assert client.get('/users/', headers=admin_headers).status_code == 200
+    assert not [q for q in query_counter if "WHERE user.id = ?" in q]  # роль из кэша, а не SELECT
+
+    client.post('/users/register', json={"username": "coach", "email": "coach@a.com", "password": "password"})
+    login = client.post('/users/login', json={"username": "coach", "password": "password"}).json
+    coach_headers = {"Authorization": f"Bearer {login['access_token']}"}
+    coach_id = login["user"]["id"]
+    assert client.get('/users/', headers=coach_headers).status_code == 403
+
+    client.put(f'/users/{coach_id}/role', json={"role": "admin"}, headers=admin_headers)
+    assert client.get('/users/', headers=coach_headers).status_code == 200
+    client.put(f'/users/{coach_id}/role', json={"role": "user"}, headers=admin_headers)
+    assert client.get('/users/', headers=coach_headers).status_code == 403
+
+
+# 6. Ответы через orjson совпадают с прежним форматом to_dict(): ISO-даты, кириллица без \u-экранирования
+def test_list_payloads_match_to_dict(client, admin_token, user_token):
+    from datetime import datetime
+    from app.extensions import db
+    from app.models import User, Section, Training
+
+    athlete = User.query.filter_by(username="athlete").one()
+    section = Section(name="Плавание", description="Бассейн 25 м")
+    athlete.sections.append(section)
+    db.session.add(Training(user_id=athlete.id, section=section, duration=60, intensity=7,
+                            date=datetime(2026, 2, 3, 7, 30, 15, 123456), note='Заплыв «4×100» — "кроль" ✓'))
+    db.session.add(Training(user_id=athlete.id, section=section, date=datetime(2026, 2, 1)))
+    db.session.commit()
+
+    res = client.get('/training/?per_page=10', headers={"Authorization": f"Bearer {user_token}"})
+    expected = [t.to_dict() for t in Training.query.order_by(Training.date.desc())]
+    assert res.json["trainings"] == expected
+    assert expected[0]["date"] == "2026-02-03T07:30:15.123456" and expected[1]["date"] == "2026-02-01T00:00:00"
+    assert 'Заплыв «4×100» — \\"кроль\\" ✓'.encode() in res.data
+
+    res = client.get('/users/', headers={"Authorization": f"Bearer {admin_token}"})
+    assert res.json["users"] == [u.to_dict() for u in User.query.order_by(User.id)]
+    assert "Бассейн 25 м".encode() in res.data
@@ -0,0 +1,70 @@
+import pytest
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, OPEN, HALF_OPEN, CLOSED
+
+
+def failing():
+    raise ConnectionError("down")
+
+
+# 1. После серии ошибок цепь размыкается и вызовы отклоняются без обращения к сервису
+def test_breaker_opens_and_recovers(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.circuit_breaker.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("test", min_calls=3, failure_rate=0.5, reset_timeout=30)
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+    assert breaker.state == OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, 1)
+    assert calls == [] and breaker.counters["rejected"] == 1
+
+    # Полуоткрытое состояние: пропускается только пробный вызов
+    clock[0] += 31
+    assert breaker.allow() is True
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.status()["opened"] == 1
+
+
+# 2. Неудачная проба снова размыкает цепь; «клиентские» исключения не считаются отказом
+def test_breaker_half_open_failure_and_ignored(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("app.services.circuit_breaker.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("test", min_calls=2, reset_timeout=10, ignored_exceptions=(ValueError,))
+
+    def bad_input():
+        raise ValueError("bad")
+
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            breaker.call(bad_input)
+    assert breaker.state == CLOSED
+
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+    assert breaker.state == OPEN
+    clock[0] += 11
+    with pytest.raises(ConnectionError):
+        breaker.call(failing)
+    assert breaker.state == OPEN
+
+
+# 3. Повторная регистрация с другими настройками — ошибка, а не молча первая конфигурация
+def test_get_breaker_config_conflict(monkeypatch):
+    from app.services import circuit_breaker
+
+    monkeypatch.setattr(circuit_breaker, "breakers", {})
+    monkeypatch.setattr(circuit_breaker, "_configs", {})
+
+    breaker = circuit_breaker.get_breaker("dep", ignored_exceptions=(ValueError,))
+    assert circuit_breaker.get_breaker("dep") is breaker
+    assert circuit_breaker.get_breaker("dep", ignored_exceptions=(ValueError,)) is breaker
+    with pytest.raises(ValueError):
+        circuit_breaker.get_breaker("dep", min_calls=10)
@@ -0,0 +1,80 @@
+import sqlite3
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.config import _database_url
+from app.database import BACKGROUND_THREADS, engine_options, replica_binds
+from app.extensions import db
+from app.models import Section, User
+
+
+# PRAGMA из app/database.py применяются к каждому соединению с файловой SQLite
+def test_sqlite_pragmas_applied(tmp_path):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}"})
+    with app.app_context():
+        pragma = lambda name: db.session.execute(db.text(f"PRAGMA {name}")).scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == 5000
+        assert pragma("temp_store") == 2  # MEMORY
+        assert db.engine.pool.size() == engine_options(app.config["SQLALCHEMY_DATABASE_URI"])["pool_size"]
+        db.engine.dispose()
+
+
+def test_engine_options_per_worker(monkeypatch):
+    monkeypatch.setenv("WEB_THREADS", "8")
+    assert engine_options("sqlite:///sportcenter.db")["pool_size"] == 8 + BACKGROUND_THREADS
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    assert engine_options("sqlite:///sportcenter.db")["pool_size"] == 3
+    assert engine_options("sqlite:///:memory:") == {}
+
+
+def test_postgres_config(monkeypatch):
+    assert _database_url("postgres://u:p@db/sport") == "postgresql://u:p@db/sport"
+    assert _database_url("sqlite:///sportcenter.db") == "sqlite:///sportcenter.db"
+
+    monkeypatch.setenv("DB_POOL_SIZE", "5")
+    options = engine_options("postgresql://u:p@db/sport")
+    assert options["pool_size"] == 5
+    assert options["max_overflow"] == 10
+    assert options["pool_pre_ping"] is True
+    assert replica_binds(None) == {}
+    assert replica_binds("postgresql://u:p@replica/sport")["replica"]["pool_pre_ping"] is True
+
+
+# Эндпоинты с @read_replica читают из реплики, запись и остальные запросы — в основную БД
+def test_read_replica_routing(tmp_path):
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{primary}",
+        "SQLALCHEMY_BINDS": replica_binds(f"sqlite:///{replica}"),
+    })
+    with app.app_context():
+        db.session.add(User(id=1, username="athlete", email="a@a.com", password_hash="x"))
+        db.session.add(Section(name="Бег"))
+        db.session.commit()
+        token = create_access_token(identity="1")
+        db.engines["replica"].dispose()
+    # Реплика — копия основной базы, отстающая на одну запись
+    with sqlite3.connect(primary) as src, sqlite3.connect(replica) as dst:
+        src.backup(dst)
+    headers = {"Authorization": f"Bearer {token}"}
+    client = app.test_client()
+
+    with app.app_context():
+        db.session.add(Section(name="Плавание"))
+        db.session.commit()
+
+    names = [s["name"] for s in client.get("/sections/").get_json()["sections"]]
+    assert names == ["Бег"]  # прочитано из реплики
+
+    res = client.post('/training/', data={"section_id": 1, "duration": 30, "intensity": 5}, headers=headers)
+    assert res.status_code == 201
+    with sqlite3.connect(primary) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM training").fetchone()[0] == 1
+    with sqlite3.connect(replica) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM training").fetchone()[0] == 0
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    db.metadatas.pop("replica")  # db общий для всех тестов, у остальных приложений реплики нет
@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta
+from app.extensions import db
+from app.models import DiaryEntry
+
+
+def week(start=date(2026, 3, 2)):
+    return [{"date": (start + timedelta(days=i)).isoformat(), "note": f"День {i}: тренировка", "section": "Бег"}
+            for i in range(7)]
+
+
+# 1. Неделя записей — один запрос и один INSERT; выборка за период
+def test_bulk_insert_and_range(client, user_token, query_counter):
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    query_counter.clear()
+    res = client.post('/diary/', json={"entries": week()}, headers=headers)
+    assert res.status_code == 201 and res.json["created"] == 7
+    assert sum(s.lstrip().upper().startswith("INSERT INTO DIARY_ENTRY") for s in query_counter) == 1
+
+    res = client.post('/diary/', json={"entries": week() + [{"date": "02.03.2026"}]}, headers=headers)
+    assert res.status_code == 400 and "Запись 7" in res.json["error"]
+    assert DiaryEntry.query.count() == 7  # битый пакет не записан целиком
+
+    for bad in ({"note": 123}, {"section": ["Бег"]}):
+        res = client.post('/diary/', json={"entries": [{"date": "2026-03-09", **bad}]}, headers=headers)
+        assert res.status_code == 400
+
+    res = client.get('/diary/?from=2026-03-03&to=2026-03-05', headers=headers)
+    assert [e["date"] for e in res.json["entries"]] == ["2026-03-05", "2026-03-04", "2026-03-03"]
+
+    res = client.get('/diary/?from=2026-03-01&to=2026-03-31&search=тренировки', headers=headers)
+    assert len(res.json["entries"]) == 7 and "<mark>" in res.json["entries"][0]["snippet"]
+
+
+# 2. Офлайн-синхронизация: идемпотентность, конфликты по времени правки, удаления
+def test_offline_sync(client, user_token):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    t0 = datetime(2026, 3, 2, 10, 0)
+    changes = [{"client_id": f"phone-{i}", "client_updated_at": (t0 + timedelta(minutes=i)).isoformat(), **e}
+               for i, e in enumerate(week())]
+
+    res = client.post('/diary/sync', json={"changes": changes}, headers=headers)
+    assert res.status_code == 200 and res.json["applied"] == 7 and res.json["changes"] == []
+    phone_since = res.json["server_time"]
+
+    # Повторная отправка того же пакета (оборвалась связь) не создает дублей
+    client.post('/diary/sync', json={"changes": changes}, headers=headers)
+    assert DiaryEntry.query.count() == 7
+
+    # Планшет правит запись позже, телефон — раньше (правка телефона проигрывает)
+    tablet = {**changes[0], "note": "Правка с планшета", "client_updated_at": (t0 + timedelta(hours=2)).isoformat()}
+    client.post('/diary/sync', json={"changes": [tablet, {**changes[1], "deleted": True,
+                "client_updated_at": (t0 + timedelta(hours=2)).isoformat()}]}, headers=headers)
+
+    stale = {**changes[0], "note": "Старая правка с телефона", "client_updated_at": (t0 + timedelta(hours=1)).isoformat()}
+    res = client.post('/diary/sync', json={"changes": [stale], "since": phone_since}, headers=headers)
+    assert res.json["conflicts"] == ["phone-0"]
+    pulled = {e["client_id"]: e for e in res.json["changes"]}
+    assert pulled["phone-0"]["note"] == "Правка с планшета"
+    assert pulled["phone-1"]["deleted"] is True
+
+    res = client.get('/diary/?from=2026-03-01&to=2026-03-31', headers=headers)
+    assert len(res.json["entries"]) == 6
+
+    res = client.post('/diary/sync', json={"changes": [{"client_id": "x", "date": "2026-03-02"}]}, headers=headers)
+    assert res.status_code == 400
+
+
+# 3. Первая синхронизация без since отдает дневник частями по MAX_PULL
+def test_sync_pull_is_paged(client, user_token, monkeypatch):
+    from app.routes import diary
+
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.post('/diary/', json={"entries": week()}, headers=headers)  # один пакет — одинаковый updated_at
+    monkeypatch.setattr(diary, "MAX_PULL", 3)
+
+    # Новое устройство без локальных правок: только загрузка
+    body, pulled = {"changes": []}, []
+    while True:
+        res = client.post('/diary/sync', json=body, headers=headers)
+        assert res.status_code == 200 and len(res.json["changes"]) <= 3
+        pulled += [e["date"] for e in res.json["changes"]]
+        if not res.json["has_more"]:
+            break
+        body = {"changes": [], "since": res.json["server_time"], "since_id": res.json["since_id"]}
+    assert sorted(pulled) == [e["date"] for e in week()]
+    assert DiaryEntry.query.count() == 7
+
+    # Запись параллельного запроса: updated_at раньше server_time, но видна стала после
+    server_time = datetime.fromisoformat(res.json["server_time"])
+    user_id = DiaryEntry.query.first().user_id
+    db.session.add(DiaryEntry(user_id=user_id, client_id="tablet-late", date=date(2026, 3, 9), note="Поздний commit",
+                              updated_at=server_time - timedelta(seconds=5)))
+    db.session.commit()
+    res = client.post('/diary/sync', json={"since": server_time.isoformat()}, headers=headers)
+    assert "tablet-late" in [e["client_id"] for e in res.json["changes"]]
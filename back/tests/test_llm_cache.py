@@ -0,0 +1,53 @@
+from app.models import LLMResponse
+from app.services import advice_service
+from app.services.llm_cache import LLMResponseCache
+
+
+# 1. Одинаковый (с точностью до пробелов) промпт после набора вариантов не идет в Ollama
+def test_llm_cache_variants_and_persistence(app, monkeypatch):
+    cache = LLMResponseCache(variants_per_key=2)
+    monkeypatch.setattr(advice_service, "llm_cache", cache)
+
+    replies = iter(["Отдыхай!", "Сегодня — прогулка.", "НЕ ДОЛЖНО ВЫЗВАТЬСЯ"])
+    calls = []
+
+    def fake_ollama(payload, timeout=10):
+        calls.append(payload["prompt"])
+
+        class Response:
+            def json(self):
+                return {"response": '{"message": "%s"}' % next(replies)}
+        return Response()
+
+    monkeypatch.setattr(advice_service, "_ollama_generate", fake_ollama)
+
+    prompt = "\n    Ты спортивный тренер.\n    Отдых.\n"
+    assert advice_service.generate_message(prompt) == "Отдыхай!"
+    assert advice_service.generate_message("Ты спортивный   тренер. Отдых.") == "Сегодня — прогулка."
+    for _ in range(10):
+        assert advice_service.generate_message(prompt) in ("Отдыхай!", "Сегодня — прогулка.")
+
+    assert len(calls) == 2
+    assert cache.status()["ollama_calls_saved"] == 10
+    assert LLMResponse.query.count() == 2
+
+    # После рестарта пул поднимается из SQLite
+    restored = LLMResponseCache(variants_per_key=2)
+    restored.load()
+    key = restored.make_key(prompt, advice_service.OLLAMA_MODEL, advice_service.OLLAMA_OPTIONS)
+    assert restored.get(key) in ("Отдыхай!", "Сегодня — прогулка.")
+
+
+# 2. Слишком длинный ответ модели обрезается под колонку message
+def test_llm_message_truncated(app, monkeypatch):
+    monkeypatch.setattr(advice_service, "llm_cache", LLMResponseCache())
+
+    class Response:
+        def json(self):
+            return {"response": '{"message": "%s"}' % ("Отдыхай! " * 100)}
+
+    monkeypatch.setattr(advice_service, "_ollama_generate", lambda payload, timeout=10: Response())
+
+    message = advice_service.generate_message("Ты спортивный тренер. Длинный ответ.")
+    assert len(message) == advice_service.MAX_MESSAGE_LENGTH
+    assert LLMResponse.query.one().message == message
@@ -0,0 +1,45 @@
+import pytest
+from app.extensions import db
+from app.routes.training import build_trainings_query
+
+
+def explain(query):
+    sql = str(query.statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+    rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+# План запроса /training/ должен идти по составным индексам, без полного скана и сортировки
+@pytest.mark.parametrize("kwargs, index", [
+    ({}, "ix_training_user_date"),
+    ({"sort": "date_asc"}, "ix_training_user_date"),
+    ({"filter_date_str": "2026-03-26"}, "ix_training_user_date"),
+    ({"section_id": 2}, "ix_training_user_section_date"),
+    ({"section_id": 2, "filter_date_str": "2026-03-26"}, "ix_training_user_section_date"),
+    ({"sort": "intensity_desc"}, "ix_training_user_intensity"),
+])
+def test_trainings_query_uses_index(app, kwargs, index):
+    plan = explain(build_trainings_query(1, **kwargs))
+    assert f"SEARCH training USING INDEX {index}" in plan
+    assert "SCAN training" not in plan
+    assert "TEMP B-TREE" not in plan
+
+
+# Поиск по заметкам идет через FTS5-индекс, а не скан training с LIKE
+def test_search_uses_fts_index(app):
+    plan = explain(build_trainings_query(1, search="тренировка в зале", sort="relevance"))
+    steps = plan.split(" | ")
+    assert steps[0] == "MATERIALIZE training_fts_hits"  # MATCH выполняется один раз
+    assert steps[1].startswith("SCAN training_fts VIRTUAL TABLE INDEX")
+    assert "SEARCH training USING INTEGER PRIMARY KEY (rowid=?)" in steps
+    assert "SCAN training" not in steps
+
+
+# Записи дневника за период — по индексу (user_id, date), без сортировки в памяти
+def test_diary_range_uses_index(app):
+    from datetime import date
+    from app.routes.diary import build_diary_query
+
+    plan = explain(build_diary_query(1, date(2026, 3, 1), date(2026, 3, 31)))
+    assert "SEARCH diary_entry USING INDEX ix_diary_user_date" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from flask_jwt_extended import decode_token
+from app.services.revocation_cache import RevocationCache, revocation_cache
+
+
+# 1. Отозванный токен находится в кэше, истекший — выпадает сам
+def test_revoked_and_expired_entries(app):
+    cache = RevocationCache(sync_interval=3600)
+    cache.load()
+    cache.add("alive", datetime.utcnow() + timedelta(minutes=15))
+    cache.add("dead", datetime.utcnow() - timedelta(seconds=1))
+
+    assert cache.is_revoked("alive") is True
+    assert cache.is_revoked("dead") is False
+    assert cache.is_revoked("unknown") is False
+    assert len(cache) == 1
+
+
+# 2. Logout сразу попадает в общий кэш воркера
+def test_logout_updates_cache(client):
+    client.post('/users/register', json={
+        "username": "logoutuser",
+        "email": "logout@user.com",
+        "password": "password"
+    })
+    token = client.post('/users/login', json={
+        "username": "logoutuser",
+        "password": "password"
+    }).json['access_token']
+
+    res = client.post('/users/logout', headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+
+    assert revocation_cache.is_revoked(decode_token(token)["jti"]) is True
+
+
+# 3. Чистка удаляет только истекшие строки и отдает размер таблицы до/после
+def test_purge_expired_tokens(app):
+    from app.extensions import db
+    from app.models import User, TokenBlocklist
+    from app.services.token_cleanup import purge_expired_tokens
+
+    user = User(username="purgeuser", email="purge@user.com")
+    user.set_password("password")
+    db.session.add(user)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    for i in range(5):
+        db.session.add(TokenBlocklist(jti=f"old-{i}", token_type="access", user_id=user.id,
+                                      revoked=True, expires=now - timedelta(minutes=1)))
+    db.session.add(TokenBlocklist(jti="fresh", token_type="access", user_id=user.id,
+                                  revoked=True, expires=now + timedelta(minutes=15)))
+    db.session.commit()
+
+    stats = purge_expired_tokens(batch_size=2)
+    assert stats["rows_before"] == 6
+    assert stats["rows_after"] == 1
+    assert stats["deleted"] == 5
+
+
+# 4. Старый одноколоночный индекс по jti удаляется из существующей базы
+def test_obsolete_jti_index_dropped(app):
+    from app.extensions import db
+    from app.utils import ensure_indexes
+
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('CREATE INDEX ix_token_blocklist_jti ON token_blocklist (jti)')
+    ensure_indexes()
+
+    names = {index["name"] for index in db.inspect(db.engine).get_indexes("token_blocklist")}
+    assert "ix_token_blocklist_jti" not in names
+    assert "ix_token_blocklist_jti_revoked" in names
+
+
+# 5. Отзыв, закоммиченный после синхронизации, но с более ранним временем (и id), не теряется
+def test_sync_picks_up_late_commits(app):
+    from app.extensions import db
+    from app.models import User, TokenBlocklist
+
+    user = User(username="lateuser", email="late@user.com")
+    user.set_password("password")
+    db.session.add(user)
+    db.session.commit()
+
+    cache = RevocationCache(sync_interval=0)
+    cache.load()
+    expires = datetime.utcnow() + timedelta(minutes=15)
+    db.session.add(TokenBlocklist(id=1000, jti="fast", token_type="access", user_id=user.id,
+                                  revoked=True, expires=expires))
+    db.session.commit()
+    assert cache.is_revoked("fast") is True
+
+    # Транзакция началась раньше (меньше id и created_at), а закоммитилась только сейчас
+    db.session.add(TokenBlocklist(id=999, jti="slow", token_type="access", user_id=user.id, revoked=True,
+                                  expires=expires, created_at=datetime.utcnow() - timedelta(seconds=10)))
+    db.session.commit()
+    assert cache.is_revoked("slow") is True
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+BACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# 1. Точка входа gunicorn (run:app) и flask --app run собирается целиком, фоновые потоки стартуют
+def test_run_module_boots():
+    env = {**os.environ, "DATABASE_URL": "sqlite:///:memory:", "TOKEN_PURGE_INTERVAL": "0"}
+    code = ("import threading, run; "
+            "print(sorted(run.app.blueprints)); "
+            "print(sorted(t.name for t in threading.enumerate()))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACK_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert "'external'" in result.stdout
+    assert "s3-deletion-queue" in result.stdout
@@ -0,0 +1,61 @@
+import io
+import pytest
+from app.services.s3_service import S3Service, UploadTooLarge
+
+
+# 1. Повторные ссылки берутся из кэша, подпись не пересчитывается
+def test_presigned_url_cache():
+    s3 = S3Service()
+    first = s3.get_urls(["a.jpg", "b.jpg", "a.jpg", None])
+    assert set(first) == {"a.jpg", "b.jpg"}
+    assert s3.url_cache_stats == {"hits": 0, "misses": 2}
+
+    second = s3.get_urls(["a.jpg", "b.jpg"])
+    assert second == first
+    assert s3.url_cache_stats == {"hits": 2, "misses": 2}
+
+    assert s3.get_url("a.jpg") == first["a.jpg"]
+    assert s3.get_url(None) is None
+
+
+# 2. Потоковая загрузка в локальный стенд S3 (moto): лимит проверяется по ходу чтения
+def test_upload_stream_limit(monkeypatch):
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("MOTO_S3_CUSTOM_ENDPOINTS", "http://minio:9000")
+
+    with moto.mock_aws():
+        s3 = S3Service(part_size=5 * 1024 * 1024)
+        s3.s3_internal.create_bucket(Bucket=s3.bucket)
+
+        data = b"x" * (6 * 1024 * 1024)
+        key = s3.upload_stream(io.BytesIO(data), "user_1/ok.jpg", "image/jpeg", max_size=8 * 1024 * 1024)
+        head = s3.s3_internal.head_object(Bucket=s3.bucket, Key=key)
+        assert head["ContentLength"] == len(data)
+
+        with pytest.raises(UploadTooLarge):
+            s3.upload_stream(io.BytesIO(data), "user_1/big.jpg", "image/jpeg", max_size=5 * 1024 * 1024)
+        listed = s3.s3_internal.list_objects_v2(Bucket=s3.bucket)
+        assert [o["Key"] for o in listed["Contents"]] == ["user_1/ok.jpg"]
+
+
+# 3. Превью: уменьшенная WebP-копия кладется рядом с оригиналом
+def test_thumbnail_generation(monkeypatch):
+    moto = pytest.importorskip("moto")
+    from PIL import Image
+    from app.services.thumbnail_service import ThumbnailService, thumb_key
+
+    monkeypatch.setenv("MOTO_S3_CUSTOM_ENDPOINTS", "http://minio:9000")
+    with moto.mock_aws():
+        s3 = S3Service()
+        s3.s3_internal.create_bucket(Bucket=s3.bucket)
+        photo = io.BytesIO()
+        Image.new("RGB", (2000, 1500), "orange").save(photo, "JPEG")
+        s3.s3_internal.put_object(Bucket=s3.bucket, Key="user_1/abc.jpg", Body=photo.getvalue())
+
+        key = ThumbnailService(s3).submit("user_1/abc.jpg").result()
+        assert key == thumb_key("user_1/abc.jpg") == "user_1/abc.thumb.webp"
+
+        body = s3.s3_internal.get_object(Bucket=s3.bucket, Key=key)["Body"].read()
+        with Image.open(io.BytesIO(body)) as thumb:
+            assert thumb.format == "WEBP"
+            assert max(thumb.size) == 480
@@ -0,0 +1,227 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models import Training, User, Section
+
+
+def seed_trainings(count):
+    user = User.query.filter_by(username="athlete").first()
+    section = Section.query.first()
+    start = datetime(2026, 1, 1)
+    for i in range(count):
+        db.session.add(Training(user_id=user.id, section_id=section.id, duration=30,
+                                intensity=i % 10 + 1, date=start + timedelta(hours=i // 2)))
+    db.session.commit()
+
+
+# 1. Keyset-пагинация проходит весь список без повторов и пропусков
+def test_cursor_pagination(client, user_token):
+    seed_trainings(23)
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    for sort in ("date_desc", "date_asc", "intensity_desc"):
+        seen, cursor = [], ""
+        while True:
+            res = client.get(f'/training/?sort={sort}&per_page=5&cursor={cursor}', headers=headers)
+            assert res.status_code == 200
+            assert "total" not in res.json
+            seen += [t["id"] for t in res.json["trainings"]]
+            cursor = res.json["next_cursor"]
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)) == 23
+
+    res = client.get('/training/?cursor=&include_total=1', headers=headers)
+    assert res.json["total"] == 23
+
+    for per_page, size in ((0, 1), (-2, 1), (1000, 23)):
+        res = client.get(f'/training/?cursor=&per_page={per_page}', headers=headers)
+        assert res.status_code == 200 and len(res.json["trainings"]) == size
+
+    res = client.get('/training/?cursor=garbage', headers=headers)
+    assert res.status_code == 400
+
+    # Корректный base64/JSON, но значения не тех типов
+    for payload in (["date_desc", 12345, 1], ["date_desc", None, 1], [["date_desc"], "x", 1],
+                    ["intensity_desc", "5", 1], ["date_desc", "2025-01-01T00:00:00", None]):
+        bad = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        res = client.get(f'/training/?cursor={bad}', headers=headers)
+        assert res.status_code == 400, payload
+
+
+# 2. Бюджет SQL-запросов не зависит от размера страницы (нет N+1)
+def test_training_list_query_budget(client, user_token, query_counter):
+    seed_trainings(40)
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    for per_page in (5, 40):
+        query_counter.clear()
+        res = client.get(f'/training/?per_page={per_page}', headers=headers)
+        assert len(res.json["trainings"]) == per_page
+        assert res.json["trainings"][0]["user"] == "athlete"
+        assert len(query_counter) <= 2  # страница + COUNT(*)
+
+
+def test_users_list_query_budget(client, admin_token, query_counter):
+    section = Section(name="Плавание")
+    for i in range(30):
+        user = User(username=f"member{i}", email=f"member{i}@user.com", password_hash="x")
+        user.sections.append(section)
+        db.session.add(user)
+    db.session.commit()
+
+    query_counter.clear()
+    res = client.get('/users/', headers={"Authorization": f"Bearer {admin_token}"})
+    assert res.status_code == 200
+    assert len(res.json["users"]) == 31
+    assert len(query_counter) <= 3  # admin_required + пользователи + секции
+
+
+# 3. Прямая загрузка в бакет: API выдает политику и потом проверяет только наличие объекта
+def test_presigned_upload_flow(client, user_token, monkeypatch):
+    from app.routes import training
+
+    headers = {"Authorization": f"Bearer {user_token}"}
+    res = client.post('/training/upload-url', json={"content_type": "image/png"}, headers=headers)
+    assert res.status_code == 200
+    file_key = res.json["file_key"]
+    assert file_key.endswith(".png")
+    assert res.json["fields"]["key"] == file_key
+    assert "policy" in res.json["fields"]
+
+    res = client.post('/training/upload-url', json={"content_type": "text/html"}, headers=headers)
+    assert res.status_code == 400
+    for body in ({"content_type": 123}, {"content_type": None}, ["image/png"]):
+        assert client.post('/training/upload-url', json=body, headers=headers).status_code == 400
+
+    section_id = Section.query.first().id
+    monkeypatch.setattr(training.thumbnails, "submit", lambda key: None)
+    monkeypatch.setattr(training.s3_service, "file_exists", lambda key: False)
+    res = client.post('/training/', data={"section_id": section_id, "file_key": file_key}, headers=headers)
+    assert res.status_code == 400
+
+    monkeypatch.setattr(training.s3_service, "file_exists", lambda key: True)
+    res = client.post('/training/', data={"section_id": section_id, "file_key": file_key}, headers=headers)
+    assert res.status_code == 201
+    assert res.json["training"]["file_key"] == file_key
+
+    listed = client.get('/training/', headers=headers).json["trainings"][0]
+    assert "file_url" in listed and ".thumb.webp" in listed["thumb_url"]
+
+    res = client.post('/training/', data={"section_id": section_id, "file_key": "user_999/x.png"}, headers=headers)
+    assert res.status_code == 400
+
+
+# 4. Удаление тренировки не ждет S3: ключ уходит в outbox и удаляется пачкой с повторами
+def test_delete_goes_through_outbox(client, user_token):
+    from app.models import S3DeletionOutbox
+    from app.services.deletion_queue import S3DeletionQueue
+
+    seed_trainings(1)
+    training = Training.query.first()
+    training.file_key = "user_1/photo.jpg"
+    db.session.commit()
+
+    res = client.delete(f'/training/{training.id}', headers={"Authorization": f"Bearer {user_token}"})
+    assert res.status_code == 200
+    assert Training.query.count() == 0
+    assert [r.file_key for r in S3DeletionOutbox.query.all()] == ["user_1/photo.jpg", "user_1/photo.thumb.webp"]
+
+    class FlakyS3:
+        calls = []
+
+        def delete_files(self, keys):
+            self.calls.append(keys)
+            # Пока пачка у этого воркера, другой ее не видит
+            assert other_worker.process_batch() == 0
+            if len(self.calls) == 1:
+                raise ConnectionError("minio down")
+            return {}
+
+    queue = S3DeletionQueue(FlakyS3())
+    other_worker = S3DeletionQueue(FlakyS3())
+    assert queue.process_batch() == 0
+    for row in S3DeletionOutbox.query.all():
+        assert row.attempts == 1 and "minio down" in row.last_error
+        row.next_attempt_at = datetime.utcnow()
+    db.session.commit()
+
+    assert queue.process_batch() == 2
+    assert S3DeletionOutbox.query.count() == 0
+    assert len(FlakyS3.calls) == 2
+
+
+# 5. Статистика читается из дневной сводки, которая обновляется вместе с тренировками
+def test_stats_rollup(client, user_token):
+    from app.services import training_stats
+
+    headers = {"Authorization": f"Bearer {user_token}"}
+    section_id = Section.query.first().id
+    # 2026-03-02 — понедельник, 2026-03-09 — следующая неделя
+    for day, duration, intensity in [("2026-03-02", 30, 4), ("2026-03-02", 60, 8), ("2026-03-04", 45, 6),
+                                     ("2026-03-09", 20, 2)]:
+        res = client.post('/training/', data={"section_id": section_id, "date": day, "duration": duration,
+                                              "intensity": intensity}, headers=headers)
+        assert res.status_code == 201
+
+    res = client.delete(f'/training/{res.json["training"]["id"]}', headers=headers)
+    assert res.status_code == 200
+
+    res = client.get('/training/stats?from=2026-03-01&to=2026-03-15', headers=headers)
+    assert res.status_code == 200
+    days = {d["date"]: d for d in res.json["days"]}
+    assert set(days) == {"2026-03-02", "2026-03-04"}  # удаленная тренировка за 09.03 не осталась
+    assert days["2026-03-02"]["sessions"] == 2
+    assert days["2026-03-02"]["duration"] == 90
+    assert days["2026-03-02"]["avg_intensity"] == 6.0
+    assert days["2026-03-02"]["load"] == 30 * 4 + 60 * 8
+    assert [(w["week_start"], w["sessions"], w["duration"]) for w in res.json["weeks"]] == [("2026-03-02", 3, 135)]
+
+    # Пересчет с нуля по сырым тренировкам дает то же самое
+    training_stats.rebuild()
+    assert client.get('/training/stats?from=2026-03-01&to=2026-03-15', headers=headers).json == res.json
+
+    assert client.get('/training/stats?from=01.03.2026', headers=headers).status_code == 400
+
+
+# 6. Полнотекстовый поиск: словоформы, ранжирование, подсветка, синхронизация триггерами
+def test_note_search(client, user_token, admin_token):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    section_id = Section.query.first().id
+    notes = [
+        "Интервальная тренировка на стадионе",
+        "Тренировки в зале: жим и тяга, тренировка тяжелая",
+        "Восстановительный бег",
+        None,
+    ]
+    ids = []
+    for note in notes:
+        data = {"section_id": section_id, **({"note": note} if note else {})}
+        ids.append(client.post('/training/', data=data, headers=headers).json["training"]["id"])
+    # Чужая заметка с тем же словом не должна находиться
+    admin = User.query.filter_by(username="testadmin").first()
+    db.session.add(Training(user_id=admin.id, section_id=section_id, note="Тренировка админа"))
+    db.session.commit()
+
+    res = client.get('/training/?search=тренировки&sort=relevance', headers=headers)
+    assert res.status_code == 200
+    found = res.json["trainings"]
+    assert [t["id"] for t in found] == [ids[1], ids[0]]  # два совпадения в одной заметке — выше
+    assert "<mark>Тренировки</mark>" in found[0]["snippet"]
+
+    assert client.get('/training/?search=зал тяг', headers=headers).json["total"] == 1  # префиксы, AND
+
+    # Текст заметки в snippet экранирован: HTML из заметки не попадет в страницу
+    client.post('/training/', data={"section_id": section_id, "note": 'Кросс <img src=x onerror="alert(1)">'},
+                headers=headers)
+    snippet = client.get('/training/?search=кросс', headers=headers).json["trainings"][0]["snippet"]
+    assert "<img" not in snippet
+    assert snippet.startswith("<mark>Кросс</mark> &lt;img")
+    assert client.get('/training/?search="OR*', headers=headers).status_code == 200  # синтаксис FTS экранирован
+
+    db.session.get(Training, ids[2]).note = "Тренировка по бегу"
+    db.session.commit()
+    client.delete(f'/training/{ids[0]}', headers=headers)
+    found = client.get('/training/?search=тренировка&cursor=', headers=headers).json["trainings"]
+    assert sorted(t["id"] for t in found) == sorted([ids[1], ids[2]])
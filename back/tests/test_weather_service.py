@@ -0,0 +1,74 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.services.weather_service import WeatherService
+
+
+@pytest.fixture
+def weather_stub():
+    # Локальная заглушка OpenWeatherMap с настраиваемой задержкой
+    state = {"calls": 0, "delay": 0.0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["calls"] += 1
+            time.sleep(state["delay"])
+            body = json.dumps({
+                "main": {"temp": 21.4},
+                "weather": [{"description": "ясно", "icon": "01d"}],
+                "name": "Moscow"
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}/weather"
+    yield state
+    server.shutdown()
+
+
+# 1. Одновременные промахи схлопываются в один запрос, дальше — попадания в кэш
+def test_weather_single_flight_and_hit_ratio(app, weather_stub):
+    weather_stub["delay"] = 0.3
+    service = WeatherService(base_url=weather_stub["url"])
+
+    def call(_):
+        with app.app_context():
+            return service.get_weather()
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(call, range(20)))
+    assert all(r == {"temp": 21, "desc": "Ясно", "icon": "01d", "city": "Moscow"} for r in results)
+    assert weather_stub["calls"] == 1
+
+    for _ in range(100):
+        service.get_weather()
+    hits = service.stats["hits"]
+    assert hits / (hits + service.stats["misses"]) > 0.8
+    assert weather_stub["calls"] == 1
+
+
+# 2. Медленный upstream не влияет на p99: устаревшие данные отдаются сразу
+def test_weather_stale_while_revalidate_latency(app, weather_stub):
+    service = WeatherService(base_url=weather_stub["url"], ttl=0, stale_ttl=3600)
+    service.get_weather()
+    weather_stub["delay"] = 1.0
+
+    latencies = []
+    for _ in range(100):
+        started = time.perf_counter()
+        assert service.get_weather()["city"] == "Moscow"
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    assert latencies[98] < 0.05
+    assert weather_stub["calls"] <= 2  # первый запрос + одно фоновое обновление
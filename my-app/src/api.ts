@@ -1,6 +1,6 @@
 import axios from "axios";
 
-const API_URL = "http://127.0.0.1:5000";
+export const API_URL = "http://127.0.0.1:5000";
 
 const api = axios.create({
   baseURL: API_URL,
@@ -1,10 +1,11 @@
 import React, { useEffect, useState } from "react";
-import api from "../api"; // Импортируем настроенный axios из Лабораторной №2
+import api, { API_URL } from "../api"; // Импортируем настроенный axios из Лабораторной №2
 
 interface AIResponse {
   status: string;
   message: string;
   suggested_intensity: number;
+  message_pending?: boolean;
 }
 
 const AIAdvisor: React.FC = () => {
@@ -12,13 +13,19 @@ const AIAdvisor: React.FC = () => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    const fetchAdvice = async () => {
+    let timer: ReturnType<typeof setTimeout> | undefined;
+
+    const fetchAdvice = async (attempt = 0) => {
       try {
         const res = await api.get("/ai/recommend");
 
         // В Axios данные лежат сразу в поле data
         if (res.data) {
           setAdvice(res.data);
+          // Цифры уже пришли, текст ИИ дописывается в фоне — заглянем позже
+          if (res.data.message_pending && attempt < 5) {
+            timer = setTimeout(() => fetchAdvice(attempt + 1), 3000);
+          }
         }
       } catch (err) {
         console.error("AI Advisor Error:", err);
@@ -27,7 +34,48 @@ const AIAdvisor: React.FC = () => {
       }
     };
 
-    fetchAdvice();
+    // SSE: цифры приходят сразу, текст ИИ — по словам.
+    // EventSource не умеет слать Authorization, поэтому читаем поток через fetch
+    const controller = new AbortController();
+    const streamAdvice = async () => {
+      const res = await fetch(`${API_URL}/ai/recommend/stream`, {
+        headers: { Authorization: `Bearer ${localStorage.getItem("access_token")}` },
+        signal: controller.signal,
+      });
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop() || "";
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+          if (event === "decision") {
+            setAdvice({ status: data.status, suggested_intensity: data.suggested_intensity, message: "" });
+            setLoading(false);
+          } else if (event === "token") {
+            setAdvice((prev) => prev && { ...prev, message: prev.message + data.text });
+          } else if (event === "done") {
+            setAdvice((prev) => prev && { ...prev, message: data.message });
+          }
+        }
+      }
+    };
+
+    // Если поток недоступен (например, истек токен) — обычный запрос с интерцепторами axios
+    streamAdvice().catch((err) => {
+      if (err.name !== "AbortError") fetchAdvice();
+    });
+    return () => {
+      controller.abort();
+      clearTimeout(timer);
+    };
   }, []);
 
   if (loading) return null;
@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useCallback } from "react";
 import { useSearchParams } from "react-router-dom";
+import axios from "axios";
 import api from "../api"; 
 
 // --- ТИПЫ ---
@@ -16,6 +17,7 @@ interface TrainingData {
   intensity: number;
   note: string;
   file_url?: string; 
+  thumb_url?: string;
 }
 
 const Diary: React.FC = () => {
@@ -81,9 +83,18 @@ const Diary: React.FC = () => {
     formData.append("intensity", String(form.intensity));
     formData.append("note", form.note);
     formData.append("date", formatDateKey(selectedDate)); 
-    if (file) formData.append("file", file);
 
     try {
+      // Фото грузим напрямую в бакет по presigned POST, API получает только file_key
+      if (file) {
+        const { data: upload } = await api.post("/training/upload-url", { content_type: file.type });
+        const s3Form = new FormData();
+        Object.entries(upload.fields as Record<string, string>).forEach(([k, v]) => s3Form.append(k, v));
+        s3Form.append("file", file);
+        await axios.post(upload.url, s3Form);
+        formData.append("file_key", upload.file_key);
+      }
+
       const res = await api.post("/training/", formData, {
         headers: { "Content-Type": "multipart/form-data" }
       });
@@ -205,10 +216,16 @@ const Diary: React.FC = () => {
                       {t.file_url && (
                         <a href={t.file_url} target="_blank" rel="noreferrer">
                           <img 
-                            src={t.file_url} 
+                            src={t.thumb_url || t.file_url} 
                             alt="отчет" 
+                            loading="lazy"
                             style={{ width: "100%", borderRadius: "8px", marginTop: "8px", marginBottom: '8px', objectFit: 'cover', maxHeight: '180px' }} 
-                            onError={(e) => (e.currentTarget.style.display = 'none')}
+                            onError={(e) => {
+                              // Превью еще не готово — показываем оригинал, иначе прячем картинку
+                              const img = e.currentTarget;
+                              if (t.file_url && img.src !== t.file_url) img.src = t.file_url;
+                              else img.style.display = 'none';
+                            }}
                           />
                         </a>
                       )}